@@ -0,0 +1,357 @@
+import base64
+import gzip
+import json
+from datetime import datetime, timedelta
+from flask import Blueprint, abort, current_app, request
+from sqlalchemy import tuple_
+from models import db, Venue, Artist, Show
+import autocomplete
+import scheduling
+import search
+from routing import read_only
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# JSON API, version 1.
+#
+# Every endpoint selects plain columns and serializes the row tuples
+# directly; no ORM objects are built. Listings use keyset cursors, `fields`
+# picks a sparse fieldset, and larger responses are brotli or gzip
+# compressed when the client accepts it.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COMPRESS_MIN_SIZE = 500
+
+VENUE_FIELDS = {
+    'id': Venue.id,
+    'name': Venue.name,
+    'city': Venue.city,
+    'state': Venue.state,
+    'address': Venue.address,
+    'phone': Venue.phone,
+    'genres': Venue.genres,
+    'website': Venue.website,
+    'facebook_link': Venue.facebook_link,
+    'image_link': Venue.image_link,
+    'seeking_talent': Venue.seeking_talent,
+    'seeking_description': Venue.seeking_description,
+    'shows_count': Venue.shows_count,
+    'upcoming_shows_count': Venue.upcoming_shows_count,
+    'next_show_time': Venue.next_show_time,
+    'updated_at': Venue.updated_at,
+}
+
+ARTIST_FIELDS = {
+    'id': Artist.id,
+    'name': Artist.name,
+    'city': Artist.city,
+    'state': Artist.state,
+    'phone': Artist.phone,
+    'genres': Artist.genres,
+    'website': Artist.website,
+    'facebook_link': Artist.facebook_link,
+    'image_link': Artist.image_link,
+    'seeking_venue': Artist.seeking_venue,
+    'seeking_description': Artist.seeking_description,
+    'shows_count': Artist.shows_count,
+    'upcoming_shows_count': Artist.upcoming_shows_count,
+    'next_show_time': Artist.next_show_time,
+    'updated_at': Artist.updated_at,
+}
+
+SHOW_FIELDS = {
+    'id': Show.id,
+    'start_time': Show.start_time,
+    'end_time': Show.end_time,
+    'venue_id': Show.venue_id,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+    'artist_id': Show.artist_id,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link,
+    'updated_at': Show.updated_at,
+}
+
+#----------------------------------------------------------------------------#
+# Encoding.
+#----------------------------------------------------------------------------#
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=_default).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, types):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(values)
+        return [kind(value) for kind, value in zip(types, values)]
+    except (ValueError, TypeError):
+        abort(400, 'invalid cursor')
+
+@api.after_request
+def compress(response):
+    if response.direct_passthrough or response.status_code < 200 or response.status_code >= 300 \
+            or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    return json_response({'error': error.description}, error.code)
+
+#----------------------------------------------------------------------------#
+# Request helpers.
+#----------------------------------------------------------------------------#
+
+def _fields(available):
+    """Return the requested [(name, column), ...]; 'id' is always included."""
+    requested = request.args.get('fields')
+    if not requested:
+        return list(available.items())
+    names = ['id'] + [name for name in requested.split(',') if name and name != 'id']
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        abort(400, 'unknown fields: {}'.format(', '.join(unknown)))
+    return [(name, available[name]) for name in names]
+
+def _page_size():
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _rows(fields, rows):
+    names = [name for name, _ in fields]
+    return [dict(zip(names, row)) for row in rows]
+
+def _page(fields, query, limit, cursor_of):
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(cursor_of(rows[-1]))
+    return json_response({'data': _rows(fields, rows), 'next': next_cursor})
+
+#----------------------------------------------------------------------------#
+# Venues and artists.
+#----------------------------------------------------------------------------#
+
+def _entity_list(model, available):
+    fields = _fields(available)
+    query = db.session.query(*[column for _, column in fields])
+    after = request.args.get('after')
+    if after:
+        (after_id,) = decode_cursor(after, [int])
+        query = query.filter(model.id > after_id)
+    return _page(fields, query.order_by(model.id), _page_size(), lambda row: [row[0]])
+
+def _entity_detail(model, available, entity_id):
+    fields = _fields(available)
+    row = db.session.query(*[column for _, column in fields]) \
+        .filter(model.id == entity_id).first()
+    if row is None:
+        abort(404, '{} {} not found'.format(model.__tablename__, entity_id))
+    return json_response({'data': _rows(fields, [row])[0]})
+
+def _entity_shows(model, show_fk, entity_id):
+    """Past or upcoming shows of a venue / artist, keyset paginated."""
+    if db.session.query(model.id).filter(model.id == entity_id).first() is None:
+        abort(404, '{} {} not found'.format(model.__tablename__, entity_id))
+
+    fields = _fields(SHOW_FIELDS)
+    query = db.session.query(*[column for _, column in fields]) \
+        .join(Venue, Venue.id == Show.venue_id) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .add_columns(Show.start_time) \
+        .filter(show_fk == entity_id)
+
+    now = datetime.now()
+    past = request.args.get('when', 'upcoming') == 'past'
+    after = request.args.get('after')
+    if after:
+        start_time, show_id = decode_cursor(after, [datetime.fromisoformat, int])
+        key = tuple_(Show.start_time, Show.id)
+        query = query.filter(key < (start_time, show_id) if past else key > (start_time, show_id))
+    if past:
+        query = query.filter(Show.start_time < now) \
+            .order_by(Show.start_time.desc(), Show.id.desc())
+    else:
+        query = query.filter(Show.start_time >= now).order_by(Show.start_time, Show.id)
+
+    # the trailing start_time column only feeds the cursor
+    return _page(fields, query, _page_size(), lambda row: [row[-1], row[0]])
+
+@api.route('/venues')
+@read_only
+def venues():
+    return _entity_list(Venue, VENUE_FIELDS)
+
+@api.route('/venues/<int:venue_id>')
+@read_only
+def venue(venue_id):
+    return _entity_detail(Venue, VENUE_FIELDS, venue_id)
+
+@api.route('/venues/<int:venue_id>/shows')
+@read_only
+def venue_shows(venue_id):
+    return _entity_shows(Venue, Show.venue_id, venue_id)
+
+@api.route('/artists')
+@read_only
+def artists():
+    return _entity_list(Artist, ARTIST_FIELDS)
+
+@api.route('/artists/<int:artist_id>')
+@read_only
+def artist(artist_id):
+    return _entity_detail(Artist, ARTIST_FIELDS, artist_id)
+
+@api.route('/artists/<int:artist_id>/shows')
+@read_only
+def artist_shows(artist_id):
+    return _entity_shows(Artist, Show.artist_id, artist_id)
+
+#----------------------------------------------------------------------------#
+# Shows and search.
+#----------------------------------------------------------------------------#
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, '{} must be an ISO 8601 date'.format(name))
+
+@api.route('/shows')
+@read_only
+def shows():
+    fields = _fields(SHOW_FIELDS)
+    query = db.session.query(*[column for _, column in fields]) \
+        .join(Venue, Venue.id == Show.venue_id) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .add_columns(Show.start_time)
+
+    if request.args.get('upcoming') == '1':
+        query = query.filter(Show.start_time >= datetime.now())
+    start, end = _date_arg('from'), _date_arg('to')
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    for name, column in (('venue_id', Show.venue_id), ('artist_id', Show.artist_id)):
+        value = request.args.get(name, type=int)
+        if value is not None:
+            query = query.filter(column == value)
+    after = request.args.get('after')
+    if after:
+        start_time, show_id = decode_cursor(after, [datetime.fromisoformat, int])
+        query = query.filter(tuple_(Show.start_time, Show.id) > (start_time, show_id))
+
+    query = query.order_by(Show.start_time, Show.id)
+    return _page(fields, query, _page_size(), lambda row: [row[-1], row[0]])
+
+@api.route('/search')
+@read_only
+def search_endpoint():
+    term = request.args.get('q', '')
+    kind = request.args.get('type', 'all')
+    limit = _page_size()
+    if kind == 'venue':
+        results = [dict(hit, type='venue') for hit in search.search_venues(term, limit)['data']]
+    elif kind == 'artist':
+        results = [dict(hit, type='artist') for hit in search.search_artists(term, limit)['data']]
+    elif kind == 'all':
+        hits = search.search_all(term)
+        try:
+            results = [hit for _, hit in zip(range(limit), hits)]
+        finally:
+            hits.close()
+    else:
+        abort(400, "type must be 'venue', 'artist' or 'all'")
+    return json_response({'data': results})
+
+@api.route('/autocomplete/venues')
+@read_only
+def autocomplete_venues():
+    limit = request.args.get('limit', autocomplete.DEFAULT_LIMIT, type=int)
+    return json_response({'data': autocomplete.complete(Venue, request.args.get('q', ''), limit)})
+
+@api.route('/autocomplete/artists')
+@read_only
+def autocomplete_artists():
+    limit = request.args.get('limit', autocomplete.DEFAULT_LIMIT, type=int)
+    return json_response({'data': autocomplete.complete(Artist, request.args.get('q', ''), limit)})
+
+#----------------------------------------------------------------------------#
+# Availability.
+#----------------------------------------------------------------------------#
+
+def _slot(candidate):
+    try:
+        duration = candidate.get('duration')
+        return scheduling.make_slot(
+            int(candidate['venue_id']),
+            int(candidate['artist_id']),
+            datetime.fromisoformat(candidate['start_time']),
+            timedelta(minutes=int(duration)) if duration else None,
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        abort(400, 'invalid slot {!r}: {}'.format(candidate, e))
+
+@api.route('/shows/availability', methods=['POST'])
+@read_only
+def availability():
+    """Check candidate slots in one round trip.
+
+    Body: {"slots": [{"venue_id", "artist_id", "start_time", "duration"}, ...]}
+    with start_time in ISO 8601 and the optional duration in minutes.
+    """
+    payload = request.get_json(silent=True) or {}
+    candidates = payload.get('slots')
+    if not isinstance(candidates, list):
+        abort(400, "expected a JSON object with a 'slots' list")
+    if len(candidates) > scheduling.MAX_SLOTS:
+        abort(400, 'at most {} slots per request'.format(scheduling.MAX_SLOTS))
+    slots = [_slot(candidate) for candidate in candidates]
+    return json_response({'data': scheduling.check_slots(slots)})
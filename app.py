@@ -3,143 +3,192 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import os
+from flask import Flask, Blueprint, current_app, render_template, request, Response, flash, redirect, url_for, abort, stream_with_context
 from flask_moment import Moment
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
 from flask_migrate import Migrate
+from jinja2 import FileSystemBytecodeCache
 from models import db, Venue, Artist, Show
-from datetime import datetime
+import queries
+import search
+import genres
+from cache import page_cache, fragment_cache, vary_on
+from conditional import conditional
+from filters import format_datetime, user_timezone
+import routing
+import profiling
+import assets
+from routing import read_only
+from importer import import_command
+from counters import refresh_counters, reconcile_command
+import upcoming
+import scheduling
+import exporter
+from api import api
+from datetime import datetime, timedelta
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-Migrate(app, db)
+main = Blueprint('main', __name__)
+moment = Moment()
 
-# TODO: connect to a local postgresql database
+# pages render dates in the viewer's timezone, so cache them per timezone
+vary_on(user_timezone)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Helpers.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+def stream_template(template_name, **context):
+  # render a template incrementally so the first rows reach the client early
+  current_app.update_template_context(context)
+  template = current_app.jinja_env.get_template(template_name)
+  stream = template.stream(context)
+  stream.enable_buffering(20)
+  return stream
 
-app.jinja_env.filters['datetime'] = format_datetime
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+def venue_page_group(venue_id):
+  return 'venue:{}'.format(venue_id)
+
+def artist_page_group(artist_id):
+  return 'artist:{}'.format(artist_id)
+
+def invalidate_venue(venue_id, artist_ids):
+  # the venue's own page, every listing it appears in and the artists it hosts
+  page_cache.invalidate('venues', 'shows', venue_page_group(venue_id),
+                        *[artist_page_group(artist_id) for artist_id in artist_ids])
+
+def invalidate_artist(artist_id, venue_ids):
+  page_cache.invalidate('artists', 'shows', artist_page_group(artist_id),
+                        *[venue_page_group(venue_id) for venue_id in venue_ids])
+
+def invalidate_show(venue_id, artist_id):
+  # listings carry show counters, so they change with every show
+  page_cache.invalidate('shows', 'venues', 'artists',
+                        venue_page_group(venue_id), artist_page_group(artist_id))
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@main.route('/')
+@read_only
+@page_cache.cached('shows')
 def index():
   # artists = Artist.query.order_by()
-  return render_template('pages/home.html')
+  next_shows = queries.next_shows(current_app.config['HOME_SHOW_LIMIT'])
+  return render_template('pages/home.html', next_shows=next_shows)
+
+@main.route('/search')
+@read_only
+def search_all():
+  # searches venues and artists together, streaming merged results
+  search_term = request.args.get('search_term', '')
+  results = search.search_all(search_term)
+  if request.args.get('format') == 'jsonl':
+    lines = (json.dumps(result) + '\n' for result in results)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+  page = stream_template('pages/search_all.html', results=results, search_term=search_term)
+  return Response(stream_with_context(page))
+
+
+#  Genres
+#  ----------------------------------------------------------------
+
+def genre_or_404(slug):
+  genre = genres.genre_for_slug(slug)
+  if genre is None:
+    abort(404)
+  return genre
+
+def flag_arg(name):
+  # '1' / '0' query args as True / False, anything else as no filter
+  value = request.args.get(name)
+  if value in ('1', '0'):
+    return value == '1'
+  return None
+
+@main.route('/genres')
+def genre_index():
+  return render_template('pages/genres.html', genres=genres.genre_slugs())
+
+@main.route('/venues/genres/<slug>')
+@read_only
+@conditional(lambda slug: queries.listing_version(Venue))
+@page_cache.cached('venues')
+def venues_by_genre(slug):
+  # e.g. /venues/genres/jazz?state=CA&seeking=1
+  genre = genre_or_404(slug)
+  areas = queries.venue_areas(
+    genre=genre,
+    state=request.args.get('state') or None,
+    seeking_talent=flag_arg('seeking')
+  )
+  return render_template('pages/venues.html', areas=areas, genre=genre)
+
+@main.route('/artists/genres/<slug>')
+@read_only
+@conditional(lambda slug: queries.listing_version(Artist))
+@page_cache.cached('artists')
+def artists_by_genre(slug):
+  genre = genre_or_404(slug)
+  artists = queries.artist_list(
+    genre=genre,
+    state=request.args.get('state') or None,
+    seeking_venue=flag_arg('seeking')
+  )
+  return render_template('pages/artists.html', artists=artists, genre=genre)
 
 
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
+@read_only
+@conditional(lambda: queries.listing_version(Venue))
+@page_cache.cached('venues')
 def venues():
-  venues = Venue.query.all()
-  cities = set()
-  for venue in venues:
-    cities.add((venue.city, venue.state))
-  
-  newdata = []
-
-  for city in cities:
-    city_venues = Venue.query.filter_by(city=city[0], state=city[1]).all()
-    city_data = {
-      'city': city[0],
-      'state': city[1],
-      'venues': city_venues
-    }
-    newdata.append(city_data)
-  
-  return render_template('pages/venues.html', areas=newdata)
+  return render_template('pages/venues.html', areas=queries.venue_areas())
 
-@app.route('/venues/search', methods=['POST'])
+@main.route('/venues/search', methods=['POST'])
+@read_only
 def search_venues():
   search_term = request.form.get('search_term', '')
-  search_query = '%{}%'.format(search_term)
-  result = Venue.query.filter(Venue.name.ilike(search_query)).all()
-  search_response={
-    "count": len(result),
-    "data": result
-  }
+  search_response = search.search_venues(search_term, limit=current_app.config['SEARCH_RESULT_LIMIT'])
 
   return render_template('pages/search_venues.html', results=search_response, search_term=request.form.get('search_term', ''))
 
-@app.route('/venues/<int:venue_id>')
+@main.route('/venues/<int:venue_id>')
+@read_only
+@conditional(queries.venue_page_version)
+@page_cache.cached(venue_page_group)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
-  venue = Venue.query.get(venue_id)
-  current_datetime = datetime.now()
-  venue_shows = Show.query.filter_by(venue_id=venue_id)
-  past_shows = []
-  upcoming_shows = []
-  for show in venue_shows:
-    show_artist = Artist.query.get(show.artist_id)
-    if(show.start_time < current_datetime):
-      past_shows.append({
-        'artist_id': show_artist.id,
-        'artist_name': show_artist.name,
-        'artist_image_link': show_artist.image_link,
-        'start_time': show.start_time.strftime("%d-%m-%Y %H:%M:%S")
-      })
-    else:
-      upcoming_shows.append({
-        'artist_id': show_artist.id,
-        'artist_name': show_artist.name,
-        'artist_image_link': show_artist.image_link,
-        'start_time': show.start_time.strftime("%d-%m-%Y %H:%M:%S")
-      })
-
-  venue_data={
-    "id": venue.id,
-    "name": venue.name,
-    "genres": venue.genres,
-    "address": venue.address,
-    "city": venue.city,
-    "state": venue.state,
-    "phone": venue.phone,
-    "website": venue.website,
-    "facebook_link": venue.facebook_link,
-    "seeking_talent": venue.seeking_talent,
-    "seeking_description": venue.seeking_description,
-    "image_link": venue.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows),
-  }
-  
+  venue_data = queries.venue_page(venue_id, limit=current_app.config['SHOW_LIST_LIMIT'])
+  if venue_data is None:
+    abort(404)
+
   return render_template('pages/show_venue.html', venue=venue_data)
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   data = request.form
   venue = Venue(
@@ -159,118 +208,92 @@ def create_venue_submission():
     db.session.commit()
   except:
     db.session.rollback()
-    error: True
+    error = True
   finally:
     db.session.close()
 
   if(error):
-    flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+    flash('An error occurred. Venue ' + data['name'] + ' could not be listed.')
+    return render_template('forms/new_venue.html', form=VenueForm()), 500
+
+  page_cache.invalidate('venues')
 
   # on successful db insert, flash success
-  flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  flash('Venue ' + data['name'] + ' was successfully listed!')
 
-  return render_template('pages/home.html')
+  return redirect(url_for('.index'))
 
-@app.route('/venues/<venue_id>/delete', methods=['POST'])
+@main.route('/venues/<venue_id>/delete', methods=['POST'])
 def delete_venue(venue_id):
   error = False
   try:
-    Venue.query.filter_by(id=venue_id).delete()
+    artist_ids = queries.artist_ids_for_venue(venue_id)
+    # bulk deletes skip the ORM cascade, and SQLite doesn't enforce ON DELETE
+    Show.query.filter_by(venue_id=venue_id).delete(synchronize_session=False)
+    Venue.query.filter_by(id=venue_id).delete(synchronize_session=False)
+    refresh_counters(artist_ids=artist_ids)
     db.session.commit()
   except:
-    db.session.rollback
+    db.session.rollback()
     error = True
   finally:
     db.session.close()
 
   if(error):
     flash('Venue could not be deleted. try again')
-    return
+    return redirect(url_for('.show_venue', venue_id=venue_id))
+
+  invalidate_venue(venue_id, artist_ids)
+  page_cache.invalidate('artists')
 
   # clicking that button delete it from the db then redirect the user to the homepage
-  return redirect(url_for('index'))
+  return redirect(url_for('.index'))
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@main.route('/artists')
+@read_only
+@conditional(lambda: queries.listing_version(Artist))
+@page_cache.cached('artists')
 def artists():
-  artists = Artist.query.all()
+  return render_template('pages/artists.html', artists=queries.artist_list())
 
-  return render_template('pages/artists.html', artists=artists)
-
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
+@read_only
 def search_artists():
   search_term = request.form.get('search_term', '')
-  search_query = '%{}%'.format(search_term)
-  result = Artist.query.filter(Artist.name.ilike(search_query)).all()
-  search_response={
-    "count": len(result),
-    "data": result
-  }
+  search_response = search.search_artists(search_term, limit=current_app.config['SEARCH_RESULT_LIMIT'])
 
   return render_template('pages/search_artists.html', results=search_response, search_term=search_term)
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@read_only
+@conditional(queries.artist_page_version)
+@page_cache.cached(artist_page_group)
 def show_artist(artist_id):
-  # shows the venue page with the given venue_id
-  artist = Artist.query.get(artist_id)
-  current_datetime = datetime.now()
-  artist_shows = Show.query.filter_by(artist_id=artist_id)
-  past_shows = []
-  upcoming_shows = []
-  for show in artist_shows:
-    show_venue = Venue.query.get(show.venue_id)
-    if(show.start_time < current_datetime):
-      past_shows.append({
-        'venue_id': show_venue.id,
-        'venue_name': show_venue.name,
-        'venue_image_link': show_venue.image_link,
-        'start_time': show.start_time.strftime("%d-%m-%Y %H:%M:%S")
-      })
-    else:
-      upcoming_shows.append({
-        'artist_id': show_venue.id,
-        'artist_name': show_venue.name,
-        'artist_image_link': show_venue.image_link,
-        'start_time': show.start_time.strftime("%d-%m-%Y %H:%M:%S")
-      })
-
-  artist_data={
-    "id": artist.id,
-    "name": artist.name,
-    "genres": artist.genres,
-    "city": artist.city,
-    "state": artist.state,
-    "phone": artist.phone,
-    "website": artist.website,
-    "facebook_link": artist.facebook_link,
-    "seeking_venue": artist.seeking_venue,
-    "seeking_description": artist.seeking_description,
-    "image_link": artist.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows),
-  }
+  # shows the artist page with the given artist_id
+  artist_data = queries.artist_page(artist_id, limit=current_app.config['SHOW_LIST_LIMIT'])
+  if artist_data is None:
+    abort(404)
 
   return render_template('pages/show_artist.html', artist=artist_data)
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
   artist = Artist.query.get(artist_id)
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   data = request.form
   artist = Artist.query.get(artist_id)
   artist.name = data['name']
   artist.city = data['city']
   artist.state = data['state']
-  artist.phone = data['phone'],
+  artist.phone = data['phone']
   artist.facebook_link = data['facebook_link']
   artist.genres = data.getlist('genres')
   error = False
@@ -284,20 +307,21 @@ def edit_artist_submission(artist_id):
     db.session.close()
 
   if (error):
-    flash('An error occurred. Artist ' + data.name + ' could not be edited.')
+    flash('An error occurred. Artist ' + data['name'] + ' could not be edited.')
+  else:
+    invalidate_artist(artist_id, queries.venue_ids_for_artist(artist_id))
+    # on successful db update, flash success
+    flash('Artist ' + data['name'] + ' was successfully edited!')
 
-  # on successful db insert, flash success
-  flash('Artist ' + request.form['name'] + ' was successfully edited!')
-
-  return redirect(url_for('show_artist', artist_id=artist_id))
+  return redirect(url_for('.show_artist', artist_id=artist_id))
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
   venue = Venue.query.get(venue_id)
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   data = request.form
   venue = Venue.query.get(venue_id)
@@ -305,7 +329,7 @@ def edit_venue_submission(venue_id):
   venue.city = data['city']
   venue.state = data['state']
   venue.address = data['address']
-  venue.phone = data['phone'],
+  venue.phone = data['phone']
   venue.image_link = data['image_link']
   venue.facebook_link = data['facebook_link']
   venue.genres = data.getlist('genres')
@@ -321,18 +345,20 @@ def edit_venue_submission(venue_id):
   
   if (error):
     flash('An error occurred. Venue could not be saved.')
+  else:
+    invalidate_venue(venue_id, queries.artist_ids_for_venue(venue_id))
   
-  return redirect(url_for('show_venue', venue_id=venue_id))
+  return redirect(url_for('.show_venue', venue_id=venue_id))
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   data = request.form
   artist = Artist(
@@ -355,57 +381,101 @@ def create_artist_submission():
     db.session.close()
 
   if (error):
-    flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+    flash('An error occurred. Artist ' + data['name'] + ' could not be listed.')
+    return render_template('forms/new_artist.html', form=ArtistForm()), 500
+
+  page_cache.invalidate('artists')
 
   # on successful db insert, flash success
-  flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  flash('Artist ' + data['name'] + ' was successfully listed!')
 
-  return render_template('pages/home.html')
+  return redirect(url_for('.index'))
 
 
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+def parse_date_arg(name):
+  value = request.args.get(name)
+  if not value:
+    return None
+  try:
+    return datetime.strptime(value, '%Y-%m-%d')
+  except ValueError:
+    abort(400)
+
+@main.route('/shows')
+@read_only
+@conditional(lambda: queries.shows_feed_version())
+@page_cache.cached('shows')
 def shows():
   # displays list of shows at /shows
-  shows = Show.query.all()
-  shows_data = []
-  for show in shows:
-    show_artist = Artist.query.get(show.artist_id)
-    show_venue = Venue.query.get(show.venue_id)
-    shows_data.append({
-      "venue_id": show_venue.id,
-      "venue_name": show_venue.name,
-      "artist_id": show_artist.id,
-      "artist_name": show_artist.name,
-      "artist_image_link": show_artist.image_link,
-      "start_time": show.start_time.strftime("%d-%m-%Y %H:%M:%S")
-    })
-
-
-  return render_template('pages/shows.html', shows=shows_data)
-
-@app.route('/shows/create')
+  try:
+    shows_data, next_cursor = queries.shows_feed(
+      page_size=current_app.config['SHOWS_PER_PAGE'],
+      after=request.args.get('after'),
+      upcoming=request.args.get('upcoming') == '1',
+      start=parse_date_arg('from'),
+      end=parse_date_arg('to'),
+      venue_id=request.args.get('venue_id', type=int),
+      artist_id=request.args.get('artist_id', type=int)
+    )
+  except ValueError:
+    abort(400)
+
+  next_url = None
+  if next_cursor is not None:
+    args = request.args.to_dict()
+    args['after'] = next_cursor
+    next_url = url_for('.shows', **args)
+
+  return render_template('pages/shows.html', shows=shows_data, next_url=next_url)
+
+@main.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
   # called to create new shows in the db, upon submitting new show listing form
-  data = request.form
+  form = ShowForm()
+  valid = form.validate()
+  for field in (form.artist_id, form.venue_id):
+    if field.data is None and not field.errors:
+      field.errors.append('This field is required.')
+      valid = False
+  if not valid:
+    for field, errors in form.errors.items():
+      flash('{}: {}'.format(field, ', '.join(errors)))
+    return render_template('forms/new_show.html', form=form), 400
+
+  duration = timedelta(minutes=form.duration.data) if form.duration.data else None
+  slot = scheduling.make_slot(form.venue_id.data, form.artist_id.data, form.start_time.data, duration)
+  check = scheduling.check_slot(slot)
+  if check['errors']:
+    for message in check['errors']:
+      flash('Show could not be listed: {}.'.format(message))
+    return render_template('forms/new_show.html', form=form), 400
+  if check['conflicts']:
+    flash('Show could not be listed: the venue or artist is already booked then.')
+    return render_template('forms/new_show.html', form=form), 409
+
   show = Show(
-    venue_id=data['venue_id'],
-    artist_id=data['artist_id'],
-    start_time=data['start_time']
+    venue_id=slot.venue_id,
+    artist_id=slot.artist_id,
+    start_time=slot.start_time,
+    end_time=slot.end_time
   )
   error = False
   try:
     db.session.add(show)
+    db.session.flush()
+    refresh_counters([show.venue_id], [show.artist_id])
     db.session.commit()
   except:
+    # includes a booking made concurrently (exclusion constraint on Postgres)
     db.session.rollback()
     error = True
   finally:
@@ -413,21 +483,49 @@ def create_show_submission():
 
   if (error):
     flash('An error occurred. Show could not be listed.')
+    return render_template('forms/new_show.html', form=form), 409
+
+  invalidate_show(slot.venue_id, slot.artist_id)
 
   # on successful db insert, flash success
   flash('Show was successfully listed!')
-  return render_template('pages/home.html')
+  return redirect(url_for('.index'))
+
+#  Export
+#  ----------------------------------------------------------------
 
-@app.errorhandler(404)
+@main.route('/export/<entity>.<format>')
+@read_only
+def export_data(entity, format):
+  # e.g. /export/shows.csv?since=2019-11-01T00:00:00
+  if entity not in exporter.EXPORTS or format not in exporter.FORMATS:
+    abort(404)
+  try:
+    since = exporter.parse_since(request.args.get('since'))
+  except ValueError:
+    abort(400)
+
+  chunks = exporter.export(entity, format, since)
+  response = Response(stream_with_context(chunks), mimetype=exporter.FORMATS[format])
+  extension = 'csv' if format == 'csv' else 'jsonl'
+  response.headers['Content-Disposition'] = 'attachment; filename={}.{}'.format(entity, extension)
+  return response
+
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
+#----------------------------------------------------------------------------#
+# App factory.
+#----------------------------------------------------------------------------#
+
+def configure_logging(app):
+  if not app.debug:
     file_handler = FileHandler('error.log')
     file_handler.setFormatter(
         Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
@@ -435,7 +533,54 @@ if not app.debug:
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+    app.logger.info('started, logging errors to error.log')
+
+  if app.config.get('REQUEST_LOG'):
+    # one JSON object per line, for the log shipper
+    request_handler = logging.StreamHandler()
+    request_handler.setFormatter(Formatter('%(message)s'))
+    profiling.request_log.addHandler(request_handler)
+    profiling.request_log.setLevel(logging.INFO)
+    profiling.request_log.propagate = False
+
+def configure_templates(app):
+  if app.config.get('TEMPLATE_BYTECODE_CACHE'):
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+  app.jinja_env.filters['datetime'] = format_datetime
+
+def create_app(config=None):
+  # config: optional mapping applied on top of config.py
+  app = Flask(__name__)
+  app.config.from_object('config')
+  if config:
+    app.config.update(config)
+  if not app.config.get('SECRET_KEY'):
+    if not app.debug:
+      raise RuntimeError('SECRET_KEY is not set; set SECRET_KEY or SECRET_KEY_FILE')
+    # the dev server is a single process, so a throwaway key is enough
+    app.config['SECRET_KEY'] = os.urandom(32)
+
+  moment.init_app(app)
+  db.init_app(app)
+  Migrate(app, db)
+  page_cache.init_app(app)
+  fragment_cache.init_app(app)
+  routing.init_app(app)
+  profiling.init_app(app)
+  assets.init_app(app)
+  app.cli.add_command(import_command)
+  app.cli.add_command(exporter.export_command)
+  app.cli.add_command(reconcile_command)
+  app.cli.add_command(upcoming.refresh_command)
+  app.cli.add_command(assets.build_command)
+  configure_templates(app)
+  app.register_blueprint(main)
+  app.register_blueprint(api)
+  configure_logging(app)
+  return app
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -443,11 +588,12 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
+# In production, serve wsgi:application with gunicorn (see gunicorn.conf.py).
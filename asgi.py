@@ -0,0 +1,210 @@
+import asyncio
+import re
+import time
+from datetime import datetime
+from flask import g, render_template
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from werkzeug.exceptions import NotFound
+from werkzeug.test import EnvironBuilder
+from models import Venue, Artist, Show
+from profiling import RequestProfile
+from app import create_app
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+#----------------------------------------------------------------------------#
+# Async serving mode.
+#
+#   uvicorn asgi:application --workers 4
+#
+# The venue and artist pages are served natively: their four independent
+# queries (entity, counts, past shows, upcoming shows) run concurrently on
+# separate pooled connections of an async engine (asyncpg on Postgres,
+# aiosqlite on SQLite), and the page is rendered with the Flask app's own
+# templates, filters and after_request hooks. Every other request is handed
+# to the sync Flask app through asgiref, which this mode therefore requires.
+#----------------------------------------------------------------------------#
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def async_database_url(url):
+    """Swap the driver of a sync database URL for its async counterpart."""
+    scheme, rest = url.split('://', 1)
+    dialect = scheme.split('+', 1)[0]
+    return '{}://{}'.format(ASYNC_DRIVERS.get(dialect, scheme), rest)
+
+def create_engine_for(app):
+    config = app.config
+    url = config.get('ASYNC_DATABASE_URL') or async_database_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.pop('connect_args', None)
+    if url.startswith('postgresql+asyncpg'):
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+        }
+    return create_async_engine(url, **options)
+
+#----------------------------------------------------------------------------#
+# Page queries.
+#----------------------------------------------------------------------------#
+
+VENUE_COLUMNS = (
+    Venue.id, Venue.name, Venue.genres, Venue.address, Venue.city, Venue.state,
+    Venue.phone, Venue.website, Venue.facebook_link, Venue.seeking_talent,
+    Venue.seeking_description, Venue.image_link,
+)
+
+ARTIST_COLUMNS = (
+    Artist.id, Artist.name, Artist.genres, Artist.city, Artist.state,
+    Artist.phone, Artist.website, Artist.facebook_link, Artist.seeking_venue,
+    Artist.seeking_description, Artist.image_link,
+)
+
+VENUE_SHOW_COLUMNS = (
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time,
+)
+
+ARTIST_SHOW_COLUMNS = (
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Venue.image_link.label('venue_image_link'),
+    Show.start_time,
+)
+
+class PageQueries(object):
+    """Builds venue / artist page data with concurrent queries."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _all(self, statement, profile):
+        # engine events can't reach the request here, so time queries directly
+        started = time.perf_counter()
+        async with self.Session() as session:
+            result = await session.execute(statement)
+            rows = result.all()
+        if profile is not None:
+            profile.record_sql(str(statement), time.perf_counter() - started)
+        return rows
+
+    async def _page(self, columns, model, show_columns, other, show_fk, entity_id, now, limit, profile):
+        shows = select(*show_columns).join(other).where(show_fk == entity_id)
+        entity, counts, past, upcoming = await asyncio.gather(
+            self._all(select(*columns).where(model.id == entity_id), profile),
+            self._all(select(
+                func.count(Show.id).filter(Show.start_time < now),
+                func.count(Show.id).filter(Show.start_time >= now),
+            ).where(show_fk == entity_id), profile),
+            self._all(shows.where(Show.start_time < now)
+                      .order_by(Show.start_time.desc(), Show.id.desc()).limit(limit), profile),
+            self._all(shows.where(Show.start_time >= now)
+                      .order_by(Show.start_time, Show.id).limit(limit), profile),
+        )
+        if not entity:
+            return None
+
+        data = dict(entity[0]._mapping)
+        data.update({
+            'past_shows': [dict(row._mapping) for row in past],
+            'upcoming_shows': [dict(row._mapping) for row in upcoming],
+            'past_shows_count': counts[0][0],
+            'upcoming_shows_count': counts[0][1],
+        })
+        return data
+
+    def venue_page(self, venue_id, now, limit, profile=None):
+        """Same data as queries.venue_page."""
+        return self._page(VENUE_COLUMNS, Venue, VENUE_SHOW_COLUMNS, Artist,
+                          Show.venue_id, venue_id, now, limit, profile)
+
+    def artist_page(self, artist_id, now, limit, profile=None):
+        """Same data as queries.artist_page."""
+        return self._page(ARTIST_COLUMNS, Artist, ARTIST_SHOW_COLUMNS, Venue,
+                          Show.artist_id, artist_id, now, limit, profile)
+
+#----------------------------------------------------------------------------#
+# ASGI application.
+#----------------------------------------------------------------------------#
+
+class AsyncApp(object):
+
+    def __init__(self, app):
+        if WsgiToAsgi is None:
+            raise RuntimeError('the async serving mode requires the asgiref package '
+                               '(pip install asgiref)')
+        self.app = app
+        self.queries = PageQueries(create_engine_for(app))
+        self.wsgi = WsgiToAsgi(app)
+        self.routes = [
+            (re.compile(r'^/venues/(\d+)$'), self.queries.venue_page, 'pages/show_venue.html', 'venue'),
+            (re.compile(r'^/artists/(\d+)$'), self.queries.artist_page, 'pages/show_artist.html', 'artist'),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for pattern, page, template, name in self.routes:
+                match = pattern.match(scope['path'])
+                if match:
+                    profile = RequestProfile(self.app.config.get('PROFILE_SLOW_QUERIES', 3))
+                    data = await page(int(match.group(1)), datetime.now(),
+                                      self.app.config['SHOW_LIST_LIMIT'], profile)
+                    response = self._render(scope, template, name, data, profile)
+                    return await self._send(scope, send, response)
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.queries.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _render(self, scope, template, name, data, profile=None):
+        """Render inside a Flask request context built from the ASGI scope.
+
+        Rendering is synchronous, so the context never spans an await.
+        """
+        environ = EnvironBuilder(
+            path=scope['path'],
+            query_string=scope['query_string'],
+            method=scope['method'],
+            headers=[(key.decode('latin-1'), value.decode('latin-1'))
+                     for key, value in scope['headers']],
+        ).get_environ()
+        with self.app.request_context(environ):
+            g.profile = profile
+            if data is None:
+                response = self.app.make_response(self.app.handle_http_exception(NotFound()))
+            else:
+                response = self.app.make_response(render_template(template, **{name: data}))
+            return self.app.process_response(response)
+
+    async def _send(self, scope, send, response):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                        for key, value in response.headers.items()],
+        })
+        body = b'' if scope['method'] == 'HEAD' else response.get_data()
+        await send({'type': 'http.response.body', 'body': body})
+
+application = AsyncApp(create_app())
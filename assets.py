@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import click
+from flask import current_app, request, send_file, url_for
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+#----------------------------------------------------------------------------#
+# Static asset pipeline.
+#
+# `flask build-assets` writes static/dist/: every static file copied under
+# a content-hashed name, the BUNDLES concatenated and minified, and .gz /
+# .br variants of everything compressible, plus manifest.json mapping each
+# logical name ('css/site.css') to its built file. Built files never change
+# under a given name, so they are served with immutable, year-long cache
+# headers, picking the precompressed variant the client accepts.
+#
+# Templates link assets through asset_url() / asset_urls(). With
+# ASSETS_BUNDLED (the default outside debug) and a manifest present they
+# point at the built files; otherwise, e.g. while editing CSS, at the
+# sources, one tag per bundle member.
+#----------------------------------------------------------------------------#
+
+BUNDLES = {
+    'css/site.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # loaded synchronously in <head>, in this order
+    'js/head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    'js/site.js': [
+        'js/script.js',
+    ],
+    # deferred, at the end of <body>, after jQuery
+    'js/footer.js': [
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json', '.txt')
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_css_url = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_css_comment = re.compile(r'/\*.*?\*/', re.S)
+_css_space = re.compile(r'\s*([{};,>])\s*')
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def _hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return '{}.{}{}'.format(root, hashlib.sha256(data).hexdigest()[:12], ext)
+
+def _write(dist, name, data):
+    path = os.path.join(dist, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if name.endswith(COMPRESSIBLE):
+        # mtime=0 keeps builds of the same input byte-identical
+        variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = _css_comment.sub('', text)
+    text = _css_space.sub(r'\1', text)
+    return ' '.join(text.split())
+
+def minify_js(text):
+    # without rjsmin the sources are only concatenated; the libraries
+    # already ship minified
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+def rewrite_css_urls(text, source, manifest, static_url):
+    """Point relative url()s of source (a static path) at built files."""
+    def replace(match):
+        quote, url = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', url, re.I):
+            return match.group(0)
+        path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+        target = os.path.normpath(os.path.join(os.path.dirname(source), path)).replace(os.sep, '/')
+        built = manifest.get(target)
+        return 'url({0}{1}/{2}{3}{0})'.format(quote, static_url, built or target, suffix)
+    return _css_url.sub(replace, text)
+
+def build(static_folder, static_url='/static'):
+    """Build static_folder/dist; returns the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        if os.path.abspath(directory) == os.path.abspath(static_folder):
+            subdirectories[:] = [name for name in subdirectories if name != DIST]
+        for filename in files:
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            built = _hashed_name(name, data)
+            _write(dist, built, data)
+            manifest[name] = '{}/{}'.format(DIST, built)
+
+    for bundle, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                text = f.read()
+            if bundle.endswith('.css'):
+                parts.append(minify_css(rewrite_css_urls(text, source, manifest, static_url)))
+            else:
+                parts.append(minify_js(text).rstrip().rstrip(';') + ';')
+        data = '\n'.join(parts).encode('utf-8')
+        built = _hashed_name(bundle, data)
+        _write(dist, built, data)
+        manifest[bundle] = '{}/{}'.format(DIST, built)
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+@click.command('build-assets')
+@with_appcontext
+def build_command():
+    """Bundle, fingerprint and precompress the static assets."""
+    manifest = build(current_app.static_folder, current_app.static_url_path)
+    current_app.extensions['assets'] = manifest
+    click.echo('Built {} assets into {}'.format(
+        len(manifest), os.path.join(current_app.static_folder, DIST)))
+
+#----------------------------------------------------------------------------#
+# Links and serving.
+#----------------------------------------------------------------------------#
+
+def _manifest():
+    return current_app.extensions.get('assets') if current_app.config.get('ASSETS_BUNDLED') else None
+
+def asset_url(name):
+    """URL of a static file (or bundle), fingerprinted when built."""
+    manifest = _manifest()
+    if manifest and name in manifest:
+        return url_for('static', filename=manifest[name])
+    return url_for('static', filename=name)
+
+def asset_urls(bundle):
+    """URLs to include for a bundle: the built bundle, or its sources."""
+    manifest = _manifest()
+    if manifest and bundle in manifest:
+        return [url_for('static', filename=manifest[bundle])]
+    return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+def serve_built(filename):
+    dist = os.path.join(current_app.static_folder, DIST)
+    path = safe_join(dist, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    if app.config.get('ASSETS_BUNDLED') and app.extensions['assets'] is None:
+        app.logger.warning('static/%s/%s is missing; serving unbundled assets '
+                           '(run `flask build-assets`)', DIST, MANIFEST)
+    app.add_url_rule('{}/{}/<path:filename>'.format(app.static_url_path, DIST),
+                     'built_asset', serve_built)
+    app.jinja_env.globals.update(asset_url=asset_url, asset_urls=asset_urls)
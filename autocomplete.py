@@ -0,0 +1,164 @@
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Name autocomplete.
+#
+# Each process keeps sorted (key, name, id) entries per model, one for every
+# word a name can be completed from ("guns n petals", "n petals", "petals"),
+# so a lookup is a bisect plus a scan of at most limit entries. The
+# index is built on first use, then kept current incrementally from this
+# process' own commits. Writes made by other processes are picked up by
+# rebuilding when the table's (count, max(updated_at)) changes, checked at
+# most every MAX_AGE seconds.
+#----------------------------------------------------------------------------#
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_AGE = 30
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+def _keys(name):
+    """Return (whole name key, [keys starting at each later word])."""
+    words = normalize(name).split()
+    return ' '.join(words), [' '.join(words[i:]) for i in range(1, len(words))]
+
+class PrefixIndex(object):
+    """Sorted (key, name, id) entries: whole names, and names from each later word."""
+
+    def __init__(self, rows=()):
+        self.names = {}
+        self.leading = []
+        self.inner = []
+        self._lock = threading.Lock()
+        for doc_id, name in rows:
+            self.names[doc_id] = name
+            whole, later = _keys(name)
+            self.leading.append((whole, name, doc_id))
+            self.inner.extend((key, name, doc_id) for key in later)
+        self.leading.sort()
+        self.inner.sort()
+
+    def add(self, doc_id, name):
+        with self._lock:
+            self._remove(doc_id)
+            self.names[doc_id] = name
+            whole, later = _keys(name)
+            insort(self.leading, (whole, name, doc_id))
+            for key in later:
+                insort(self.inner, (key, name, doc_id))
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        name = self.names.pop(doc_id, None)
+        if name is None:
+            return
+        whole, later = _keys(name)
+        for entries, key in [(self.leading, whole)] + [(self.inner, key) for key in later]:
+            i = bisect_left(entries, (key, name, doc_id))
+            if i < len(entries) and entries[i] == (key, name, doc_id):
+                del entries[i]
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        """Return up to limit (id, name) pairs, names starting with prefix first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found, seen = [], set()
+        with self._lock:
+            for entries in (self.leading, self.inner):
+                i = bisect_left(entries, (prefix,))
+                while i < len(entries) and len(found) < limit:
+                    key, name, doc_id = entries[i]
+                    if not key.startswith(prefix):
+                        break
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        found.append((doc_id, name))
+                    i += 1
+        return found
+
+#----------------------------------------------------------------------------#
+# Per-model indexes.
+#----------------------------------------------------------------------------#
+
+_indexes = {}
+_checked = {}
+
+def _version(model):
+    return tuple(db.session.query(func.count(model.id), func.max(model.updated_at)).one())
+
+def _index(model):
+    entry = _indexes.get(model)
+    now = time.monotonic()
+    if entry is not None and now - _checked.get(model, 0) < MAX_AGE:
+        return entry[1]
+
+    version = _version(model)
+    _checked[model] = now
+    if entry is None or entry[0] != version:
+        index = PrefixIndex(db.session.query(model.id, model.name))
+        _indexes[model] = entry = (version, index)
+    return entry[1]
+
+def complete(model, prefix, limit=DEFAULT_LIMIT):
+    """Return [{'id', 'name'}, ...] for names of model completing prefix."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    return [{'id': doc_id, 'name': name} for doc_id, name in _index(model).complete(prefix, limit)]
+
+def invalidate():
+    """Drop the indexes, e.g. after writes that bypass the ORM."""
+    _indexes.clear()
+
+#----------------------------------------------------------------------------#
+# Incremental updates from committed ORM writes.
+#----------------------------------------------------------------------------#
+
+def _pending(session):
+    return session.info.setdefault('autocomplete', [])
+
+def _record_save(mapper, connection, target):
+    _pending(Session.object_session(target)).append((type(target), target.id, target.name))
+
+def _record_delete(mapper, connection, target):
+    _pending(Session.object_session(target)).append((type(target), target.id, None))
+
+def _record_bulk(context):
+    if context.mapper.class_ in (Venue, Artist):
+        _pending(context.session).append((context.mapper.class_, None, None))
+
+def _after_commit(session):
+    for model, doc_id, name in session.info.pop('autocomplete', []):
+        entry = _indexes.get(model)
+        if entry is None:
+            continue
+        if doc_id is None:
+            # bulk statements don't say which rows they touched
+            _indexes.pop(model, None)
+        elif name is None:
+            entry[1].remove(doc_id)
+        else:
+            entry[1].add(doc_id, name)
+
+def _after_rollback(session):
+    session.info.pop('autocomplete', None)
+
+for _model in (Venue, Artist):
+    event.listen(_model, 'after_insert', _record_save)
+    event.listen(_model, 'after_update', _record_save)
+    event.listen(_model, 'after_delete', _record_delete)
+event.listen(Session, 'after_bulk_update', _record_bulk)
+event.listen(Session, 'after_bulk_delete', _record_bulk)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
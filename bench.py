@@ -0,0 +1,408 @@
+"""Benchmark every page and API route against generated data.
+
+    python bench.py --scale 10k                      # SQLite, compare with bench_baseline.json
+    python bench.py --scale 100k --database postgresql://localhost/fyyur_bench
+    python bench.py --scale 10k --save-baseline      # record a new baseline
+
+Generates a seeded, reproducible catalogue of venues, artists and shows
+(--scale is the number of shows: 10k, 100k, 1M or any count; there is one
+venue per 20 shows and one artist per 10) into the given database, which is
+wiped first. SQLite databases are created from the models; a Postgres
+database is migrated to head so its triggers, views and constraints exist.
+
+Each route is then requested through the Flask test client, cycling over a
+sample of ids, and its p50 / p95 / p99 latency and SQL statements per
+request are reported. Results are compared with the stored baseline for the
+same scale and database: the run fails (exit status 1) when a route runs
+more statements than its baseline, or its median latency grows by more
+than --tolerance (p95 / p99 are too noisy over a few dozen requests to gate
+on). Latencies depend on the machine, so record the baseline on the
+machine that runs the comparison (e.g. the CI runner).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, 'bench_baseline.json')
+SCALES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+CHUNK_SIZE = 10000
+
+# endpoint, path and, for POSTs, a form or JSON body; {venue_id} /
+# {artist_id} / {genre} are filled from the generated data and {start_time}
+# with a free slot after every existing show. Heavy routes run
+# --heavy-requests times. Writes come last and leave their changes behind.
+Route = namedtuple('Route', 'endpoint path heavy method form json status')
+Route.__new__.__defaults__ = (False, 'GET', None, None, 200)
+
+VENUE_FORM = {
+    'name': 'Bench Hall', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Bench Street',
+    'phone': '415-000-0000', 'image_link': 'https://example.com/bench.jpg',
+    'facebook_link': 'https://www.facebook.com/bench', 'genres': 'Jazz',
+}
+ARTIST_FORM = {
+    'name': 'Bench Band', 'city': 'San Francisco', 'state': 'CA', 'phone': '415-000-0000',
+    'image_link': 'https://example.com/bench.jpg',
+    'facebook_link': 'https://www.facebook.com/bench', 'genres': 'Jazz',
+}
+
+ROUTES = [
+    Route('main.index', '/'),
+    Route('main.venues', '/venues'),
+    Route('main.artists', '/artists'),
+    Route('main.shows', '/shows'),
+    Route('main.shows', '/shows?upcoming=1'),
+    Route('main.search_all', '/search?search_term=hall'),
+    Route('main.search_venues', '/venues/search', method='POST', form={'search_term': 'hall'}),
+    Route('main.search_artists', '/artists/search', method='POST', form={'search_term': 'ma'}),
+    Route('main.genre_index', '/genres'),
+    Route('main.venues_by_genre', '/venues/genres/{genre}'),
+    Route('main.artists_by_genre', '/artists/genres/{genre}'),
+    Route('main.show_venue', '/venues/{venue_id}'),
+    Route('main.show_artist', '/artists/{artist_id}'),
+    Route('main.edit_venue', '/venues/{venue_id}/edit'),
+    Route('main.edit_artist', '/artists/{artist_id}/edit'),
+    Route('main.create_venue_form', '/venues/create'),
+    Route('main.create_artist_form', '/artists/create'),
+    Route('main.create_shows', '/shows/create'),
+    Route('main.export_data', '/export/venues.csv', heavy=True),
+    Route('main.export_data', '/export/shows.jsonl', heavy=True),
+    Route('api.venues', '/api/v1/venues'),
+    Route('api.venue', '/api/v1/venues/{venue_id}'),
+    Route('api.venue_shows', '/api/v1/venues/{venue_id}/shows'),
+    Route('api.artists', '/api/v1/artists'),
+    Route('api.artist', '/api/v1/artists/{artist_id}'),
+    Route('api.artist_shows', '/api/v1/artists/{artist_id}/shows?when=past'),
+    Route('api.shows', '/api/v1/shows?upcoming=1'),
+    Route('api.search_endpoint', '/api/v1/search?q=hall'),
+    Route('api.autocomplete_venues', '/api/v1/autocomplete/venues?q=the'),
+    Route('api.autocomplete_artists', '/api/v1/autocomplete/artists?q=ma'),
+    Route('api.availability', '/api/v1/shows/availability', method='POST', json={'slots': [
+        {'venue_id': '{venue_id}', 'artist_id': '{artist_id}', 'start_time': '{start_time}'},
+    ]}),
+    Route('main.create_venue_submission', '/venues/create', method='POST', form=VENUE_FORM, status=302),
+    Route('main.create_artist_submission', '/artists/create', method='POST', form=ARTIST_FORM, status=302),
+    Route('main.edit_venue_submission', '/venues/{venue_id}/edit', method='POST', form=VENUE_FORM, status=302),
+    Route('main.edit_artist_submission', '/artists/{artist_id}/edit', method='POST', form=ARTIST_FORM, status=302),
+    Route('main.create_show_submission', '/shows/create', method='POST', status=302, form={
+        'venue_id': '{venue_id}', 'artist_id': '{artist_id}', 'start_time': '{start_time}'}),
+]
+# static files are not pages, metrics is off while benchmarking, and
+# deleting would empty the sampled ids
+SKIPPED_ENDPOINTS = {'static', 'built_asset', 'metrics', 'main.delete_venue'}
+
+#----------------------------------------------------------------------------#
+# Data generation.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'), ('Brooklyn', 'NY'),
+    ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'),
+    ('Portland', 'OR'), ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Denver', 'CO'),
+]
+WORDS = [
+    'Amber', 'Blue', 'Copper', 'Dusty', 'Electric', 'Golden', 'Hollow', 'Iron', 'Jade',
+    'Lunar', 'Midnight', 'Neon', 'Velvet', 'Rusty', 'Silver', 'Wild', 'Crimson', 'Paper',
+]
+VENUE_KINDS = ['Hall', 'Room', 'Lounge', 'Theatre', 'Club', 'Tavern', 'Garden', 'Cellar']
+FIRST_NAMES = ['Matt', 'Maya', 'Ana', 'Leo', 'Nina', 'Omar', 'Rosa', 'Theo', 'Zoe', 'Béla']
+LAST_NAMES = ['Quevedo', 'Fleck', 'Moreau', 'Okafor', 'Lindqvist', 'Tanaka', 'Rivera', 'Novak']
+BAND_NOUNS = ['Petals', 'Wolves', 'Engines', 'Tides', 'Lanterns', 'Machines', 'Saints', 'Owls']
+
+def parse_scale(value):
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value.replace('_', ''))
+
+def _venue_rows(rng, count, genres):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        yield {
+            'name': 'The {} {} {}'.format(rng.choice(WORDS), rng.choice(VENUE_KINDS), i),
+            'city': city,
+            'state': state,
+            'address': '{} {} St'.format(rng.randint(1, 9999), rng.choice(WORDS)),
+            'phone': '555-{:03d}-{:04d}'.format(rng.randint(0, 999), rng.randint(0, 9999)),
+            'image_link': 'https://images.example.com/venues/{}.jpg'.format(i),
+            'facebook_link': 'https://www.facebook.com/venue{}'.format(i),
+            'genres': rng.sample(genres, rng.randint(1, 3)),
+            'seeking_talent': rng.random() < 0.3,
+            'website': 'https://venue{}.example.com'.format(i),
+        }
+
+def _artist_rows(rng, count, genres):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        if rng.random() < 0.5:
+            name = '{} {} {}'.format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), i)
+        else:
+            name = '{} {} {}'.format(rng.choice(WORDS), rng.choice(BAND_NOUNS), i)
+        yield {
+            'name': name,
+            'city': city,
+            'state': state,
+            'phone': '555-{:03d}-{:04d}'.format(rng.randint(0, 999), rng.randint(0, 9999)),
+            'image_link': 'https://images.example.com/artists/{}.jpg'.format(i),
+            'facebook_link': 'https://www.facebook.com/artist{}'.format(i),
+            'genres': rng.sample(genres, rng.randint(1, 2)),
+            'seeking_venue': rng.random() < 0.3,
+        }
+
+def _show_rows(rng, count, venues, artists, now):
+    # Shows are laid out in time slots, each holding shows at distinct venues
+    # by distinct artists, so no two shows ever overlap on a venue or an
+    # artist (Postgres enforces that with exclusion constraints). The slots
+    # span two years centred on now.
+    per_slot = max(1, min(venues, artists) // 10)
+    slots = -(-count // per_slot)
+    spacing = max(timedelta(hours=3), timedelta(days=730) / slots)
+    first = (now - spacing * (slots // 2)).replace(second=0, microsecond=0)
+    for slot in range(slots):
+        start = first + spacing * slot
+        size = min(per_slot, count - slot * per_slot)
+        for venue_id, artist_id in zip(rng.sample(range(1, venues + 1), size),
+                                       rng.sample(range(1, artists + 1), size)):
+            yield {
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': start,
+                'end_time': start + timedelta(hours=2),
+            }
+
+def _insert(table, rows):
+    from models import db
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+
+def reset_schema(app):
+    from models import db
+    if db.engine.dialect.name == 'postgresql':
+        from flask_migrate import upgrade
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY CASCADE'))
+        db.session.commit()
+    else:
+        db.drop_all()
+        db.create_all()
+
+def generate(app, shows, seed=1, now=None):
+    """Fill the database with shows shows and matching venues / artists."""
+    from models import db, Venue, Artist, Show
+    from counters import reconcile_counters
+    from genres import GENRES
+    from upcoming import refresh_upcoming_shows
+
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    venues, artists = max(10, shows // 20), max(10, shows // 10)
+    with app.app_context():
+        reset_schema(app)
+        _insert(Venue.__table__, _venue_rows(rng, venues, list(GENRES)))
+        _insert(Artist.__table__, _artist_rows(rng, artists, list(GENRES)))
+        _insert(Show.__table__, _show_rows(rng, shows, venues, artists, now))
+        db.session.commit()
+        reconcile_counters(now)
+        refresh_upcoming_shows(now)
+    return venues, artists
+
+#----------------------------------------------------------------------------#
+# Measurement.
+#----------------------------------------------------------------------------#
+
+class StatementCounter(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+def uncovered_endpoints(app):
+    covered = {route.endpoint for route in ROUTES} | SKIPPED_ENDPOINTS
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint not in covered})
+
+def route_name(route):
+    return route.path if route.method == 'GET' else '{} {}'.format(route.method, route.path)
+
+def _fill(value, values):
+    if isinstance(value, dict):
+        return {key: _fill(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, values) for item in value]
+    return value.format(**values)
+
+def measure(app, venues, artists, requests, heavy_requests, warmup, seed=1, only=()):
+    """Return {path: {'endpoint', 'p50_ms', 'p95_ms', 'p99_ms', 'queries'}}."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from bench_async import percentile
+    from genres import GENRES, slugify
+
+    rng = random.Random(seed)
+    with app.app_context():
+        from models import db, Show
+        latest = db.session.query(db.func.max(Show.start_time)).scalar() or datetime.now()
+    samples = {
+        'venue_id': [rng.randint(1, venues) for _ in range(20)],
+        'artist_id': [rng.randint(1, artists) for _ in range(20)],
+        'genre': [slugify(genre) for genre in rng.sample(list(GENRES), 5)],
+    }
+    statements = StatementCounter()
+    event.listen(Engine, 'after_cursor_execute', statements)
+    client = app.test_client()
+    results = {}
+    try:
+        for route in ROUTES:
+            name = route_name(route)
+            if only and not any(part in name for part in only):
+                continue
+            runs = heavy_requests if route.heavy else requests
+            latencies, queries = [], []
+            for i in range(warmup + runs):
+                values = {key: sample[i % len(sample)] for key, sample in samples.items()}
+                # a day apart, after every show, so new bookings never conflict
+                values['start_time'] = (latest + timedelta(days=i + 1)).replace(microsecond=0).isoformat(' ')
+                path = route.path.format(**values)
+                form = _fill(route.form, values) if route.form else None
+                body = _fill(route.json, values) if route.json else None
+                statements.count = 0
+                started = time.perf_counter()
+                response = client.open(path, method=route.method, data=form, json=body)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                if response.status_code != route.status:
+                    raise RuntimeError('{} {} returned {}'.format(route.method, path, response.status_code))
+                if i >= warmup:
+                    latencies.append(elapsed)
+                    queries.append(statements.count)
+            results[name] = {
+                'endpoint': route.endpoint,
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'queries': max(queries),
+            }
+    finally:
+        event.remove(Engine, 'after_cursor_execute', statements)
+    return results
+
+#----------------------------------------------------------------------------#
+# Baseline.
+#----------------------------------------------------------------------------#
+
+def baseline_key(scale, database_url):
+    return '{}:{}'.format(database_url.split(':', 1)[0].split('+', 1)[0], scale)
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, key, results):
+    baselines = load_baselines(path)
+    baselines[key] = results
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def regressions(results, baseline, tolerance, slack_ms=1.0):
+    """Return a description of every route that got worse than baseline."""
+    found = []
+    for path, result in sorted(results.items()):
+        before = baseline.get(path)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            found.append('{}: {} statements per request, baseline {}'.format(
+                path, result['queries'], before['queries']))
+        limit = before['p50_ms'] * (1 + tolerance) + slack_ms
+        if result['p50_ms'] > limit:
+            found.append('{}: p50 {:.1f} ms, baseline {:.1f} ms'.format(
+                path, result['p50_ms'], before['p50_ms']))
+    return found
+
+def print_results(results, baseline):
+    print('{:<44} {:>8} {:>8} {:>8} {:>8} {:>10}'.format(
+        'route', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'base p50'))
+    for path, result in results.items():
+        before = baseline.get(path, {})
+        print('{:<44} {p50_ms:>8.1f} {p95_ms:>8.1f} {p99_ms:>8.1f} {queries:>8} {:>10}'.format(
+            path, '{:.1f}'.format(before['p50_ms']) if before else '-', **result))
+
+#----------------------------------------------------------------------------#
+# Launch.
+#----------------------------------------------------------------------------#
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='Number of shows: 10k, 100k, 1M or a count.')
+    parser.add_argument('--database', help='Database URL (wiped); defaults to a SQLite file in the temp dir.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reuse', action='store_true', help='Skip generation; the database already holds this scale.')
+    parser.add_argument('--requests', type=int, default=50, help='Measured requests per route.')
+    parser.add_argument('--heavy-requests', type=int, default=3, help='Measured requests per export route.')
+    parser.add_argument('--warmup', type=int, default=3, help='Requests per route before measuring.')
+    parser.add_argument('--route', action='append', dest='routes', default=[],
+                        help='Only measure paths containing this text (repeatable).')
+    parser.add_argument('--cache', action='store_true', help='Keep the page cache on (measures cache hits).')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative growth of the median latency.')
+    args = parser.parse_args()
+
+    shows = parse_scale(args.scale)
+    database_url = args.database or 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur-bench.db')
+    # config.py reads these at import
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['DEBUG'] = '0'
+    from app import create_app
+    app = create_app({
+        'SECRET_KEY': 'bench',
+        'CACHE_TYPE': 'simple' if args.cache else 'null',
+        'UPCOMING_REFRESH_DELAY': 0,
+        'PROFILE_HEADERS': False,
+        'REQUEST_LOG': False,
+        'METRICS_ENABLED': False,
+        'NPLUSONE_MODE': 'warn',
+        'WTF_CSRF_ENABLED': False,
+    })
+
+    venues, artists = max(10, shows // 20), max(10, shows // 10)
+    if not args.reuse:
+        started = time.perf_counter()
+        generate(app, shows, args.seed)
+        print('Generated {} shows, {} venues, {} artists in {:.1f}s'.format(
+            shows, venues, artists, time.perf_counter() - started))
+    for endpoint in uncovered_endpoints(app):
+        print('warning: {} is not benchmarked; add it to ROUTES'.format(endpoint), file=sys.stderr)
+
+    results = measure(app, venues, artists, args.requests, args.heavy_requests,
+                      args.warmup, args.seed, args.routes)
+    key = baseline_key(shows, database_url)
+    baseline = load_baselines(args.baseline).get(key, {})
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, key, results)
+        print('Saved baseline {} to {}'.format(key, args.baseline))
+        return
+    found = regressions(results, baseline, args.tolerance)
+    if found:
+        print('\nRegressions against baseline {}:'.format(key))
+        print('\n'.join('  ' + line for line in found))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
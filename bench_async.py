@@ -0,0 +1,93 @@
+"""Compare the sync (WSGI) and async (ASGI) servers under concurrent load.
+
+Start both against the same database, e.g.
+
+    gunicorn -w 4 --threads 8 -b 127.0.0.1:5000 wsgi:application
+    uvicorn asgi:application --workers 4 --port 8000
+
+then run
+
+    python bench_async.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:8000 \\
+        --clients 500 --requests 20000 --path /venues/1 --path /artists/1
+
+Each client is a coroutine issuing requests back to back over fresh
+connections, cycling through the given paths. Only the standard library is
+used, so the load generator is not the bottleneck being measured.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from urllib.parse import urlsplit
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write('GET {} HTTP/1.1\r\nHost: {}\r\nConnection: close\r\n\r\n'.format(path, host).encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+async def run(base_url, paths, clients, total):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    remaining = itertools.count()
+    path_cycle = itertools.cycle(paths)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while next(remaining) < total:
+            started = time.perf_counter()
+            try:
+                status = await fetch(host, port, next(path_cycle))
+            except OSError:
+                status = None
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sync', dest='sync_url', help='Base URL of the WSGI server.')
+    parser.add_argument('--async', dest='async_url', help='Base URL of the ASGI server.')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable).')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--warmup', type=int, default=500, help='Requests sent before measuring.')
+    args = parser.parse_args()
+    paths = args.paths or ['/venues/1', '/artists/1']
+
+    print('{:<6} {:>9} {:>7} {:>10} {:>9} {:>9} {:>9}'.format(
+        'mode', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for mode, url in (('sync', args.sync_url), ('async', args.async_url)):
+        if not url:
+            continue
+        asyncio.run(run(url, paths, min(args.clients, args.warmup), args.warmup))
+        result = asyncio.run(run(url, paths, args.clients, args.requests))
+        print('{:<6} {requests:>9} {errors:>7} {rps:>10.1f} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}'.format(
+            mode, **result))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+#----------------------------------------------------------------------------#
+# Page and fragment cache.
+#
+# Cached entries belong to a named group ('venues', 'venue:12', ...). Every
+# key embeds its group's current generation, so invalidating a group is a
+# single counter bump: entries from older generations are never looked up
+# again and simply age out of the backend.
+#
+# Generations live in the backend, so an invalidation only holds within the
+# processes sharing it: with CACHE_TYPE 'simple' that is the one process that
+# made the write, and other workers keep serving their stale copies until
+# they expire. Run more than one worker only with 'redis'.
+#----------------------------------------------------------------------------#
+
+_variants = []
+
+def vary_on(function):
+    """Register a function of the current request that cached pages vary on."""
+    _variants.append(function)
+    return function
+
+def request_variant():
+    return tuple(function() for function in _variants)
+
+class NullBackend(object):
+    """Caches nothing; used when CACHE_TYPE is 'null'."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def generation(self, group):
+        return 0
+
+    def bump(self, group):
+        pass
+
+class LRUBackend(object):
+    """In-process LRU cache with per-entry TTL. Invalidations made in one
+    process are not seen by any other.
+
+    Generations are kept outside the LRU so evicting entries can never roll
+    a group back to an older generation.
+    """
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, group):
+        return self._generations.get(group, 0)
+
+    def bump(self, group):
+        with self._lock:
+            self._generations[group] = self._generations.get(group, 0) + 1
+
+class RedisBackend(object):
+    """Cache shared by every worker, stored in Redis (needs the redis package)."""
+
+    def __init__(self, url, prefix='fyyur:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_TYPE 'redis' requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(timeout))
+
+    def generation(self, group):
+        return int(self.client.get(self.prefix + 'gen:' + group) or 0)
+
+    def bump(self, group):
+        self.client.incr(self.prefix + 'gen:' + group)
+
+class PageCache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.timeout = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'simple')
+        if cache_type == 'simple':
+            self.backend = LRUBackend(app.config.get('CACHE_THRESHOLD', 500))
+        elif cache_type == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif cache_type == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError('unknown CACHE_TYPE {!r}'.format(cache_type))
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        app.extensions['page_cache'] = self
+
+    def _key(self, group, key):
+        return '{}:{}:{}'.format(group, self.backend.generation(group), key)
+
+    def get_or_set(self, group, key, create, timeout=None):
+        """Return the cached value for key in group, creating it on a miss."""
+        full_key = self._key(group, key)
+        value = self.backend.get(full_key)
+        if value is None:
+            value = create()
+            self.backend.set(full_key, value, timeout or self.timeout)
+        return value
+
+    def invalidate(self, *groups):
+        for group in groups:
+            self.backend.bump(group)
+
+    def cached(self, group, timeout=None):
+        """Cache a GET view's response under group.
+
+        group is a string or a callable taking the view arguments, e.g.
+        lambda venue_id: 'venue:{}'.format(venue_id). Each distinct path,
+        query string and vary_on() value is a separate entry, and so is each
+        ETag set by an enclosing @conditional, so a body is never served
+        under a newer ETag than the one it was rendered for. Requests with
+        pending flash messages bypass the cache, since the layout renders them.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if request.method != 'GET' or session.get('_flashes'):
+                    return view(**kwargs)
+
+                name = group(**kwargs) if callable(group) else group
+                full_key = self._key(name, (request.full_path, request_variant(), g.get('etag')))
+                hit = self.backend.get(full_key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    return current_app.response_class(body, status=status, mimetype=mimetype)
+
+                response = current_app.make_response(view(**kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    entry = (response.get_data(), response.status_code, response.mimetype)
+                    self.backend.set(full_key, entry, timeout or self.timeout)
+                return response
+            return wrapper
+        return decorator
+
+page_cache = PageCache()
+
+#----------------------------------------------------------------------------#
+# Template fragments.
+#
+#   {% cache 'venue', venue.id, venue.updated_at %}...{% endcache %}
+#
+# caches the rendered block under its key (plus the request's vary_on()
+# values). Keys carry the version of what the block renders, so entries are
+# never invalidated: a changed row gets a new key and the old entry ages
+# out. Fragments are many and small, so they live in their own in-process
+# LRU (FRAGMENT_CACHE_THRESHOLD entries) even when pages are cached in
+# Redis; a round trip per tile would cost more than rendering it.
+#----------------------------------------------------------------------------#
+
+class FragmentCache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.timeout = 3600
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if app.config.get('CACHE_TYPE', 'simple') == 'null':
+            self.backend = NullBackend()
+        else:
+            self.backend = LRUBackend(app.config.get('FRAGMENT_CACHE_THRESHOLD', 20000))
+        self.timeout = app.config.get('FRAGMENT_CACHE_TIMEOUT', 3600)
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    def get_or_set(self, key, create):
+        if has_request_context():
+            key = (key, request_variant())
+        value = self.backend.get(key)
+        if value is None:
+            value = create()
+            self.backend.set(key, value, self.timeout)
+        return value
+
+fragment_cache = FragmentCache()
+
+class FragmentCacheExtension(Extension):
+    """The {% cache key, ... %} tag."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        key = nodes.Tuple(parts, 'load')
+        return nodes.CallBlock(self.call_method('_render', [key]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        return Markup(fragment_cache.get_or_set(key, lambda: str(caller())))
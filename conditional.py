@@ -0,0 +1,52 @@
+import hashlib
+from functools import wraps
+from flask import current_app, g, request, session
+from cache import request_variant
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#
+# A validator function returns a cheap summary of everything a page depends
+# on (modification timestamps, row counts). The summary is hashed into a
+# strong ETag, and a matching If-None-Match is answered with 304 before the
+# view runs its page queries or renders a template.
+#
+# No Last-Modified is sent: deletes and shows moving into the past change a
+# page without moving any timestamp, so If-Modified-Since can't be trusted.
+# The ETag is left in g.etag, which page_cache.cached() adds to its key so a
+# cached body is only ever served under the ETag it was rendered for.
+#----------------------------------------------------------------------------#
+
+def make_etag(summary):
+    return hashlib.sha1(repr(summary).encode('utf-8')).hexdigest()
+
+def conditional(validator):
+    """Add an ETag to a GET view and answer 304 when unchanged.
+
+    validator takes the view arguments and returns the page's summary, or
+    None when the page doesn't exist (the view then runs as usual).
+    Requests with pending flash messages are always rendered in full.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**kwargs)
+
+            summary = validator(**kwargs)
+            if summary is None:
+                return view(**kwargs)
+            etag = g.etag = make_etag((request.full_path, request_variant(), summary))
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
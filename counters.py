@@ -0,0 +1,64 @@
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select
+from models import db, Venue, Artist, Show
+from cache import page_cache
+
+#----------------------------------------------------------------------------#
+# Denormalized show counters.
+#
+# Venue and Artist carry shows_count, upcoming_shows_count and
+# next_show_time so listings can show them without touching Show. Writes
+# recount the venues / artists they affect in the same transaction (one
+# index range scan each on the (venue_id / artist_id, start_time) indexes).
+# Shows drift from upcoming to past with the clock alone, so `flask
+# reconcile-counters` is meant to run periodically (e.g. from cron every few
+# minutes); it recounts everything but only writes the rows that changed.
+#----------------------------------------------------------------------------#
+
+def _counter_values(model, show_fk, now):
+    """Correlated subqueries computing each counter for a row of model."""
+    owned = show_fk == model.id
+    return {
+        'shows_count': select(func.count(Show.id)).where(owned).scalar_subquery(),
+        'upcoming_shows_count': select(func.count(Show.id))
+            .where(owned, Show.start_time >= now).scalar_subquery(),
+        'next_show_time': select(func.min(Show.start_time))
+            .where(owned, Show.start_time >= now).scalar_subquery(),
+    }
+
+def _refresh(model, show_fk, ids, now):
+    # a Core UPDATE, so the search index invalidation hooks don't fire
+    table = model.__table__
+    values = _counter_values(model, show_fk, now)
+    changed = or_(*[table.c[name].is_distinct_from(value) for name, value in values.items()])
+    statement = table.update().values(**values).where(changed)
+    if ids is not None:
+        statement = statement.where(model.id.in_(ids))
+    return db.session.execute(statement).rowcount
+
+def refresh_counters(venue_ids=(), artist_ids=(), now=None):
+    """Recount the given venues and artists; call before committing a show write."""
+    now = now or datetime.now()
+    venue_ids, artist_ids = set(venue_ids), set(artist_ids)
+    if venue_ids:
+        _refresh(Venue, Show.venue_id, venue_ids, now)
+    if artist_ids:
+        _refresh(Artist, Show.artist_id, artist_ids, now)
+
+def reconcile_counters(now=None):
+    """Recount every venue and artist; returns the number of rows corrected."""
+    now = now or datetime.now()
+    corrected = _refresh(Venue, Show.venue_id, None, now) \
+        + _refresh(Artist, Show.artist_id, None, now)
+    db.session.commit()
+    if corrected:
+        page_cache.invalidate('venues', 'artists')
+    return corrected
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_command():
+    """Recount the show counters on every venue and artist."""
+    click.echo('Corrected {} rows'.format(reconcile_counters()))
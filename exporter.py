@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#
+# Venues, artists and shows (with venue and artist names joined in) are read
+# through a server-side cursor, yield_per rows at a time, and written out
+# as they arrive as CSV, JSON lines or columnar chunks (one JSON object per
+# chunk mapping each column to its list of values). `since` restricts the
+# export to rows modified at or after a timestamp, for incremental syncs.
+#----------------------------------------------------------------------------#
+
+DEFAULT_CHUNK_SIZE = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'columnar': 'application/x-ndjson',
+}
+
+def _venue_query():
+    return db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.phone,
+        Venue.genres, Venue.website, Venue.facebook_link, Venue.image_link,
+        Venue.seeking_talent, Venue.seeking_description, Venue.updated_at,
+    ), Venue
+
+def _artist_query():
+    return db.session.query(
+        Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+        Artist.genres, Artist.website, Artist.facebook_link, Artist.image_link,
+        Artist.seeking_venue, Artist.seeking_description, Artist.updated_at,
+    ), Artist
+
+def _show_query():
+    return db.session.query(
+        Show.id, Show.start_time, Show.end_time,
+        Show.venue_id, Venue.name.label('venue_name'),
+        Show.artist_id, Artist.name.label('artist_name'),
+        Show.updated_at,
+    ).join(Show.venue).join(Show.artist), Show
+
+EXPORTS = {
+    'venues': _venue_query,
+    'artists': _artist_query,
+    'shows': _show_query,
+}
+
+def export_rows(entity, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (column names, row iterator) for an entity, streamed by id."""
+    query, model = EXPORTS[entity]()
+    if since is not None:
+        query = query.filter(model.updated_at >= since)
+    query = query.order_by(model.id) \
+        .execution_options(stream_results=True).yield_per(chunk_size)
+    columns = [column['name'] for column in query.column_descriptions]
+    return columns, iter(query)
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ','.join(value)
+    return _plain(value)
+
+def csv_chunks(columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def jsonl_chunks(columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_plain, row)))))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def columnar_chunks(columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    def chunk(values):
+        return json.dumps({
+            'count': len(values[0]),
+            'columns': dict(zip(columns, values)),
+        }) + '\n'
+
+    values = [[] for _ in columns]
+    for row in rows:
+        for column, value in zip(values, row):
+            column.append(_plain(value))
+        if len(values[0]) == chunk_size:
+            yield chunk(values)
+            values = [[] for _ in columns]
+    if values[0]:
+        yield chunk(values)
+
+WRITERS = {
+    'csv': csv_chunks,
+    'jsonl': jsonl_chunks,
+    'columnar': columnar_chunks,
+}
+
+def export(entity, format, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the export of entity in format as text chunks."""
+    columns, rows = export_rows(entity, since, chunk_size)
+    return WRITERS[format](columns, rows, chunk_size)
+
+def parse_since(value):
+    """Parse an ISO 8601 'since' timestamp; None for an empty value."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+@click.command('export')
+@click.argument('entity', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'format', type=click.Choice(sorted(FORMATS)), default='csv', show_default=True)
+@click.option('--since', help='Only rows modified at or after this ISO 8601 timestamp.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+@with_appcontext
+def export_command(entity, format, since, output, chunk_size):
+    """Stream venues, artists or shows out as CSV, JSON lines or columnar chunks."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter('not an ISO 8601 timestamp', param_hint='--since')
+    for chunk in export(entity, format, since, chunk_size):
+        output.write(chunk)
@@ -0,0 +1,55 @@
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, available_timezones
+from babel import Locale
+from babel.dates import parse_pattern
+from flask import current_app, has_request_context, request
+
+#----------------------------------------------------------------------------#
+# Datetime filter.
+#
+# Views hand datetime objects straight to the template. Naive values are
+# read as STORAGE_TIMEZONE and shown in DISPLAY_TIMEZONE or, with
+# USER_TIMEZONES on, the viewer's 'timezone' cookie. Babel patterns are
+# parsed once per (format, locale, timezone) and reused.
+#----------------------------------------------------------------------------#
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+TIMEZONE_COOKIE = 'timezone'
+
+@lru_cache(maxsize=None)
+def _known_timezones():
+    return frozenset(available_timezones())
+
+def user_timezone():
+    """Name of the timezone dates are shown in for the current request."""
+    if has_request_context() and current_app.config.get('USER_TIMEZONES'):
+        name = request.cookies.get(TIMEZONE_COOKIE)
+        if name in _known_timezones():
+            return name
+    return current_app.config['DISPLAY_TIMEZONE']
+
+@lru_cache(maxsize=512)
+def _formatter(format, locale_name, zone_name, storage_zone_name):
+    pattern = parse_pattern(FORMATS.get(format, format))
+    locale = Locale.parse(locale_name)
+    zone = ZoneInfo(zone_name)
+    storage_zone = ZoneInfo(storage_zone_name)
+
+    def apply(value):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=storage_zone)
+        return pattern.apply(value.astimezone(zone), locale)
+    return apply
+
+def format_datetime(value, format='medium'):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    config = current_app.config
+    formatter = _formatter(format, config['BABEL_DEFAULT_LOCALE'],
+                           user_timezone(), config['STORAGE_TIMEZONE'])
+    return formatter(value)
@@ -0,0 +1,62 @@
+import json
+import re
+from functools import lru_cache
+from sqlalchemy import cast
+from models import db
+
+#----------------------------------------------------------------------------#
+# Genre vocabulary.
+#
+# The one list of genres shared by the venue / artist forms and the genre
+# browse queries. Genres are stored by name in the Venue.genres and
+# Artist.genres arrays (GIN indexed on Postgres); URLs use their slugs.
+#----------------------------------------------------------------------------#
+
+GENRES = (
+    'Alternative',
+    'Blues',
+    'Classical',
+    'Country',
+    'Electronic',
+    'Folk',
+    'Funk',
+    'Hip-Hop',
+    'Heavy Metal',
+    'Instrumental',
+    'Jazz',
+    'Musical Theatre',
+    'Pop',
+    'Punk',
+    'R&B',
+    'Reggae',
+    'Rock n Roll',
+    'Soul',
+    'Other',
+)
+
+def slugify(genre):
+    return re.sub(r'[^a-z0-9]+', '-', genre.lower()).strip('-')
+
+@lru_cache(maxsize=None)
+def genre_choices():
+    return [(genre, genre) for genre in GENRES]
+
+@lru_cache(maxsize=None)
+def genre_slugs():
+    """Return [(slug, genre), ...] in vocabulary order."""
+    return [(slugify(genre), genre) for genre in GENRES]
+
+@lru_cache(maxsize=None)
+def _genres_by_slug():
+    return dict(genre_slugs())
+
+def genre_for_slug(slug):
+    """Return the genre name for a URL slug, or None if it isn't one."""
+    return _genres_by_slug().get(slug)
+
+def has_genre(column, genre):
+    """SQL criterion for a genres column containing genre."""
+    if db.engine.dialect.name == 'postgresql':
+        return column.contains([genre])
+    # JSON-encoded list elsewhere (SQLite)
+    return cast(column, db.Text).like('%{}%'.format(json.dumps(genre)))
@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+from config import env_int
+
+#----------------------------------------------------------------------------#
+# Gunicorn settings for wsgi:application.
+#
+# The app is imported once in the master (preload_app) and forked into the
+# workers, which share its memory copy-on-write. Each worker is recycled
+# after max_requests (+ jitter, so they don't all restart together) to bound
+# memory growth. An in-process page cache ('simple') can't be invalidated
+# across workers, so with more than one the workers run without a page cache;
+# set CACHE_TYPE=redis to share one.
+#
+# Reloads:
+#   kill -HUP $(cat gunicorn.pid)     new config, workers replaced gracefully;
+#                                     application code is NOT reloaded, since
+#                                     it was preloaded in the master
+#   kill -USR2 $(cat gunicorn.pid)    start a new master with the new code,
+#   kill -QUIT <old master pid>       then stop the old one once it is up
+#----------------------------------------------------------------------------#
+
+bind = os.environ.get('BIND', '0.0.0.0:{}'.format(os.environ.get('PORT', '8000')))
+workers = env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+worker_class = 'gthread'
+threads = env_int('GUNICORN_THREADS', 4)
+preload_app = True
+pidfile = os.environ.get('GUNICORN_PIDFILE', 'gunicorn.pid')
+
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = 5
+
+def _per_process_cache(server, application):
+    # an in-process page cache is invalidated only in the worker that wrote
+    return server.cfg.workers > 1 and application.config['CACHE_TYPE'] == 'simple'
+
+def when_ready(server):
+    from wsgi import application
+    if _per_process_cache(server, application):
+        server.log.warning("CACHE_TYPE 'simple' can't be invalidated across %d workers; "
+                           "pages are not cached. Set CACHE_TYPE=redis to cache them.",
+                           server.cfg.workers)
+
+def post_fork(server, worker):
+    from cache import page_cache
+    from models import db
+    from wsgi import application
+    if _per_process_cache(server, application):
+        application.config['CACHE_TYPE'] = 'null'
+        page_cache.init_app(application)
+    # connections opened in the master must not be shared across processes
+    with application.app_context():
+        db.engine.dispose()
+        for bind in application.config['REPLICA_BINDS']:
+            db.get_engine(bind=bind).dispose()
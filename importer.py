@@ -0,0 +1,293 @@
+import csv
+import json
+import time
+from datetime import timedelta
+import click
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, DEFAULT_SHOW_DURATION
+from cache import page_cache
+from counters import refresh_counters
+import autocomplete
+import scheduling
+import upcoming
+import search
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Streams CSV or JSON lines, validates each row with the same form used by
+# the web UI, and writes batches as multi-row INSERTs in one transaction per
+# batch. Memory stays at one batch whatever the file size. Shows may refer
+# to venues and artists by id or by exact name; both are resolved one query
+# per batch, and shows that would double-book a venue or artist are rejected.
+#----------------------------------------------------------------------------#
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+class RowError(Exception):
+    pass
+
+def read_rows(stream, format):
+    """Yield one dict per CSV row, or the text of each JSON line, in stream.
+
+    JSON lines are parsed by import_rows, so a malformed one is rejected
+    like any other invalid row.
+    """
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            yield row
+    else:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+
+def _parse(row):
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise RowError('not an object')
+    return row
+
+def _formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key == 'genres':
+            if isinstance(value, str):
+                value = [genre.strip() for genre in value.split(',') if genre.strip()]
+            for genre in value:
+                data.add(key, genre)
+        else:
+            data.add(key, str(value))
+    return data
+
+def _validate(form_class, row):
+    form = form_class(formdata=_formdata(row), meta={'csrf': False})
+    if not form.validate():
+        raise RowError('; '.join(
+            '{}: {}'.format(field, ', '.join(errors)) for field, errors in form.errors.items()
+        ))
+    return form.data
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y')
+
+def _optional(row, key):
+    return row.get(key) or None
+
+def _venue_record(row):
+    data = _validate(VenueForm, row)
+    return {
+        'name': data['name'],
+        'city': data['city'],
+        'state': data['state'],
+        'address': data['address'],
+        'phone': data['phone'] or '',
+        'image_link': data['image_link'],
+        'facebook_link': data['facebook_link'],
+        'genres': data['genres'],
+        'website': _optional(row, 'website'),
+        'seeking_talent': _flag(row.get('seeking_talent')),
+        'seeking_description': _optional(row, 'seeking_description'),
+    }
+
+def _artist_record(row):
+    data = _validate(ArtistForm, row)
+    return {
+        'name': data['name'],
+        'city': data['city'],
+        'state': data['state'],
+        'phone': data['phone'] or '',
+        'image_link': data['image_link'],
+        'facebook_link': data['facebook_link'],
+        'genres': data['genres'],
+        'website': _optional(row, 'website'),
+        'seeking_venue': _flag(row.get('seeking_venue')),
+        'seeking_description': _optional(row, 'seeking_description'),
+    }
+
+def _id(value, field):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError('{}: not an id'.format(field))
+
+def _show_record(row):
+    data = _validate(ShowForm, row)
+    duration = timedelta(minutes=data['duration']) if data['duration'] else DEFAULT_SHOW_DURATION
+    return {
+        'venue_id': _id(data['venue_id'], 'venue_id'),
+        'venue_name': _optional(row, 'venue_name'),
+        'artist_id': _id(data['artist_id'], 'artist_id'),
+        'artist_name': _optional(row, 'artist_name'),
+        'start_time': data['start_time'],
+        'end_time': data['start_time'] + duration,
+    }
+
+class _KeyResolver(object):
+    """Resolves ids / names of one model to ids, remembering what it has seen."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = set()
+        self.names = {}
+
+    def load(self, ids, names):
+        ids = set(ids) - self.ids
+        if ids:
+            rows = db.session.query(self.model.id).filter(self.model.id.in_(ids))
+            self.ids.update(row.id for row in rows)
+        names = set(names) - set(self.names)
+        if names:
+            rows = db.session.query(self.model.id, self.model.name) \
+                .filter(self.model.name.in_(names)).order_by(self.model.id)
+            for row in rows:
+                self.names.setdefault(row.name, row.id)
+
+    def resolve(self, key, name):
+        if key is not None:
+            if key in self.ids:
+                return key
+            raise RowError('{} {} does not exist'.format(self.model.__tablename__, key))
+        if name in self.names:
+            return self.names[name]
+        raise RowError('{} {!r} does not exist'.format(self.model.__tablename__, name))
+
+def _resolve_shows(batch, venues, artists, report):
+    """Swap names for ids in a batch of show records, one lookup per model."""
+    venues.load([r['venue_id'] for _, r in batch if r['venue_id']],
+                [r['venue_name'] for _, r in batch if not r['venue_id'] and r['venue_name']])
+    artists.load([r['artist_id'] for _, r in batch if r['artist_id']],
+                 [r['artist_name'] for _, r in batch if not r['artist_id'] and r['artist_name']])
+    resolved = []
+    for line, record in batch:
+        try:
+            resolved.append((line, {
+                'venue_id': venues.resolve(record['venue_id'], record['venue_name']),
+                'artist_id': artists.resolve(record['artist_id'], record['artist_name']),
+                'start_time': record['start_time'],
+                'end_time': record['end_time'],
+            }))
+        except RowError as e:
+            report.reject('record {}: {}'.format(line, e))
+    return resolved
+
+def _reject_conflicts(batch, report):
+    """Drop shows that clash with existing shows or earlier ones in the batch."""
+    slots = [scheduling.Slot(r['venue_id'], r['artist_id'], r['start_time'], r['end_time'])
+             for _, r in batch]
+    clashes = set()
+    for start in range(0, len(slots), scheduling.MAX_SLOTS):
+        results = scheduling.check_slots(slots[start:start + scheduling.MAX_SLOTS])
+        clashes.update(start + i for i, result in enumerate(results) if result['conflicts'])
+    clashes.update(scheduling.overlapping_within(slots, clashes))
+
+    kept = []
+    for i, (line, record) in enumerate(batch):
+        if i in clashes:
+            report.reject('record {}: the venue or artist is already booked then'.format(line))
+        else:
+            kept.append((line, record))
+    return kept
+
+ENTITIES = {
+    'venues': (Venue, _venue_record),
+    'artists': (Artist, _artist_record),
+    'shows': (Show, _show_record),
+}
+
+class ImportReport(object):
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    def reject(self, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    @property
+    def rate(self):
+        return self.inserted / max(time.monotonic() - self.started, 1e-9)
+
+def import_rows(entity, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Validate and insert rows (an iterable of dicts or JSON object strings)
+    of the given entity.
+
+    Returns an ImportReport. progress, if given, is called with the report
+    after each committed batch.
+    """
+    model, to_record = ENTITIES[entity]
+    venues, artists = _KeyResolver(Venue), _KeyResolver(Artist)
+    report = ImportReport()
+    table = model.__table__
+
+    def flush(batch):
+        if model is Show:
+            batch = _reject_conflicts(_resolve_shows(batch, venues, artists, report), report)
+        if batch:
+            records = [record for _, record in batch]
+            db.session.execute(table.insert(), records)
+            if model is Show:
+                refresh_counters([r['venue_id'] for r in records], [r['artist_id'] for r in records])
+            db.session.commit()
+            report.inserted += len(batch)
+        if progress is not None:
+            progress(report)
+
+    batch = []
+    for line, row in enumerate(rows, start=1):
+        try:
+            batch.append((line, to_record(_parse(row))))
+        except (RowError, ValueError, TypeError, AttributeError) as e:
+            report.reject('record {}: {}'.format(line, e))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    search.invalidate_local_indexes()
+    autocomplete.invalidate()
+    page_cache.invalidate(entity)
+    if model is Show:
+        page_cache.invalidate('venues', 'artists')
+        # Core inserts bypass the ORM events that normally trigger this
+        upcoming.refresh_soon()
+    return report
+
+@click.command('import')
+@click.argument('entity', type=click.Choice(sorted(ENTITIES)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; defaults to the file extension.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_command(entity, source, format, batch_size):
+    """Bulk load venues, artists or shows from a CSV or JSON lines file."""
+    if format is None:
+        format = 'jsonl' if source.name.endswith(('.jsonl', '.json')) else 'csv'
+
+    def progress(report):
+        click.echo('{} inserted, {} rejected, {:.0f} rows/s'.format(
+            report.inserted, report.rejected, report.rate), err=True)
+
+    report = import_rows(entity, read_rows(source, format), batch_size, progress)
+    for error in report.errors:
+        click.echo(error, err=True)
+    if report.rejected > len(report.errors):
+        click.echo('... and {} more rejected rows'.format(report.rejected - len(report.errors)), err=True)
+    click.echo('Imported {} {} ({} rejected) at {:.0f} rows/s'.format(
+        report.inserted, entity, report.rejected, report.rate))
@@ -0,0 +1,27 @@
+"""add updated_at timestamps
+
+Revision ID: 26d6cb9ddb32
+Revises: ce8abd64c6ca
+Create Date: 2026-10-18 14:05:39.204817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '26d6cb9ddb32'
+down_revision = 'ce8abd64c6ca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,39 @@
+"""add show counters to venues and artists
+
+Revision ID: 5e1f0c7a9d24
+Revises: 26d6cb9ddb32
+Create Date: 2026-10-18 18:20:11.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f0c7a9d24'
+down_revision = '26d6cb9ddb32'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, fk in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        # start_time is naive local time, as in counters.py's datetime.now()
+        op.execute('''
+            UPDATE "{table}" SET
+                shows_count = (SELECT count(*) FROM "Show" WHERE "Show".{fk} = "{table}".id),
+                upcoming_shows_count = (SELECT count(*) FROM "Show"
+                    WHERE "Show".{fk} = "{table}".id AND "Show".start_time >= LOCALTIMESTAMP),
+                next_show_time = (SELECT min("Show".start_time) FROM "Show"
+                    WHERE "Show".{fk} = "{table}".id AND "Show".start_time >= LOCALTIMESTAMP)
+        '''.format(table=table, fk=fk))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'next_show_time')
+        op.drop_column(table, 'upcoming_shows_count')
+        op.drop_column(table, 'shows_count')
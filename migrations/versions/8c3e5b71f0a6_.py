@@ -0,0 +1,42 @@
+"""add show end_time and booking exclusion constraints
+
+Existing double bookings have to be resolved before upgrading: the
+exclusion constraints cannot be added over conflicting rows.
+
+Revision ID: 8c3e5b71f0a6
+Revises: d40b6a2c8e71
+Create Date: 2026-10-18 19:04:31.662150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e5b71f0a6'
+down_revision = 'd40b6a2c8e71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute('''UPDATE "Show" SET end_time = start_time + interval '2 hours' ''')
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_Show_duration', 'Show',
+                               "end_time > start_time AND end_time <= start_time + interval '24 hours'")
+
+    # btree_gist lets the integer id share a GiST index with the time range
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute('''
+            ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_booking"
+            EXCLUDE USING gist ({0} WITH =, tsrange(start_time, end_time) WITH &&)
+        '''.format(column))
+
+
+def downgrade():
+    for column in ('artist_id', 'venue_id'):
+        op.drop_constraint('ex_Show_{}_booking'.format(column), 'Show')
+    op.drop_constraint('ck_Show_duration', 'Show')
+    op.drop_column('Show', 'end_time')
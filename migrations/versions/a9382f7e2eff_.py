@@ -0,0 +1,70 @@
+"""add full text and trigram search
+
+Revision ID: a9382f7e2eff
+Revises: 100962453a31
+Create Date: 2026-10-18 11:26:52.370419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9382f7e2eff'
+down_revision = '100962453a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Artist.genres was created as a plain string; the model (and the search
+    # trigger below) expect an array like Venue.genres.
+    op.alter_column('Artist', 'genres',
+                    type_=postgresql.ARRAY(sa.String()),
+                    existing_type=sa.String(length=120),
+                    existing_nullable=False,
+                    postgresql_using='genres::varchar[]')
+
+    op.add_column('Venue', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.add_column('Artist', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute("""
+        CREATE FUNCTION fyyur_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('Venue', 'Artist'):
+        op.execute("""
+            CREATE TRIGGER "{0}_search_vector_update"
+            BEFORE INSERT OR UPDATE OF name, city, state, genres ON "{0}"
+            FOR EACH ROW EXECUTE PROCEDURE fyyur_search_vector_update()
+        """.format(table))
+        op.execute('UPDATE "{0}" SET name = name'.format(table))
+        op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'],
+                        unique=False, postgresql_using='gin')
+        op.create_index('ix_{}_name_trgm'.format(table), table, ['name'],
+                        unique=False, postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table in ('Venue', 'Artist'):
+        op.drop_index('ix_{}_name_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+        op.execute('DROP TRIGGER "{0}_search_vector_update" ON "{0}"'.format(table))
+        op.drop_column(table, 'search_vector')
+    op.execute('DROP FUNCTION fyyur_search_vector_update()')
+    op.alter_column('Artist', 'genres',
+                    type_=sa.String(length=120),
+                    existing_type=postgresql.ARRAY(sa.String()),
+                    existing_nullable=False,
+                    postgresql_using="array_to_string(genres, ',')")
@@ -0,0 +1,24 @@
+"""add venue area listing index
+
+Revision ID: b83b146f0b13
+Revises: f7c9698fc91a
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83b146f0b13'
+down_revision = 'f7c9698fc91a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_state_city_name', 'Venue', ['state', 'city', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_state_city_name', table_name='Venue')
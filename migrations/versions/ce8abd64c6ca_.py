@@ -0,0 +1,26 @@
+"""add genre indexes
+
+Revision ID: ce8abd64c6ca
+Revises: a9382f7e2eff
+Create Date: 2026-10-18 12:48:05.671132
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce8abd64c6ca'
+down_revision = 'a9382f7e2eff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
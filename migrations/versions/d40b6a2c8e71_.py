@@ -0,0 +1,47 @@
+"""add UpcomingShow materialized view
+
+Revision ID: d40b6a2c8e71
+Revises: 5e1f0c7a9d24
+Create Date: 2026-10-18 18:42:57.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd40b6a2c8e71'
+down_revision = '5e1f0c7a9d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # start_time holds naive local wall-clock values, compared everywhere
+    # else against datetime.now(), so the view uses local time too
+    op.execute('''
+        CREATE MATERIALIZED VIEW "UpcomingShow" AS
+        SELECT "Show".id, "Show".start_time,
+               "Show".venue_id, "Venue".name AS venue_name,
+               "Venue".city AS venue_city, "Venue".state AS venue_state,
+               "Venue".image_link AS venue_image_link,
+               "Show".artist_id, "Artist".name AS artist_name,
+               "Artist".image_link AS artist_image_link,
+               greatest("Show".updated_at, "Venue".updated_at, "Artist".updated_at) AS updated_at
+        FROM "Show"
+        JOIN "Venue" ON "Venue".id = "Show".venue_id
+        JOIN "Artist" ON "Artist".id = "Show".artist_id
+        WHERE "Show".start_time >= LOCALTIMESTAMP
+        WITH DATA
+    ''')
+    # REFRESH ... CONCURRENTLY needs a unique index
+    op.create_index('ix_UpcomingShow_id', 'UpcomingShow', ['id'], unique=True)
+    op.create_index('ix_UpcomingShow_start_time_id', 'UpcomingShow', ['start_time', 'id'], unique=False)
+    op.create_index('ix_UpcomingShow_venue_id_start_time', 'UpcomingShow', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_UpcomingShow_artist_id_start_time', 'UpcomingShow', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_UpcomingShow_venue_state_venue_city_start_time', 'UpcomingShow',
+                    ['venue_state', 'venue_city', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW "UpcomingShow"')
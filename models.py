@@ -1,6 +1,34 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from routing import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+
+# Bumped on every ORM insert / update; feeds the ETag of the pages built
+# from each row.
+def _updated_at():
+    return db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Shows without an explicit end_time run for DEFAULT_SHOW_DURATION; no show
+# may run longer than MAX_SHOW_DURATION (conflict checks rely on it).
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+MAX_SHOW_DURATION = timedelta(hours=24)
+
+def _default_end_time(context):
+    return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_DURATION
+
+# Show counters on Venue / Artist, kept up to date by counters.py
+def _counter():
+    return db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+# Postgres keeps genres in a native array and search text in a trigger
+# maintained tsvector; SQLite (offline runs) falls back to JSON / TEXT so the
+# same models work on both.
+def _genre_list():
+    return db.ARRAY(db.String).with_variant(db.JSON(), 'sqlite')
+
+def _search_vector():
+    return db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite'), nullable=True))
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -8,6 +36,10 @@ db = SQLAlchemy()
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_state_city_name', 'state', 'city', 'name'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -17,38 +49,85 @@ class Venue(db.Model):
     phone = db.Column(db.String(120), nullable=False)
     image_link = db.Column(db.String(500), nullable=False)
     facebook_link = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.ARRAY(db.String), nullable=True)
+    genres = db.Column(_genre_list(), nullable=True)
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(), nullable=True)
     website = db.Column(db.String(120), nullable=True)
-    db.relationship('Show', backref='venue', lazy=True, cascade='all, delete-orphan')
+    search_vector = _search_vector()
+    updated_at = _updated_at()
+    shows_count = _counter()
+    upcoming_shows_count = _counter()
+    next_show_time = db.Column(db.DateTime, nullable=True)
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade='all, delete-orphan')
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(_genre_list(), nullable=False)
     image_link = db.Column(db.String(500), nullable=False)
     facebook_link = db.Column(db.String(120), nullable=False)
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(), nullable=True)
     website = db.Column(db.String(120), nullable=True)
-    db.relationship('Show', backref='artist', lazy=True, cascade='all, delete-orphan')
+    search_vector = _search_vector()
+    updated_at = _updated_at()
+    shows_count = _counter()
+    upcoming_shows_count = _counter()
+    next_show_time = db.Column(db.DateTime, nullable=True)
+    shows = db.relationship('Show', backref='artist', lazy=True, cascade='all, delete-orphan')
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime(), nullable=False)
+    end_time = db.Column(db.DateTime(), nullable=False, default=_default_end_time)
+    updated_at = _updated_at()
+
+class UpcomingShow(db.Model):
+    """Upcoming shows with their venue and artist denormalized, read only.
+
+    A materialized view on Postgres and a summary table elsewhere; refreshed
+    by upcoming.py, so it can lag the Show table by a few seconds.
+    """
+    __tablename__ = 'UpcomingShow'
+    __table_args__ = (
+        db.Index('ix_UpcomingShow_start_time_id', 'start_time', 'id'),
+        db.Index('ix_UpcomingShow_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_UpcomingShow_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_UpcomingShow_venue_state_venue_city_start_time', 'venue_state', 'venue_city', 'start_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime(), nullable=False)
+    venue_id = db.Column(db.Integer, nullable=False)
+    venue_name = db.Column(db.String, nullable=False)
+    venue_city = db.Column(db.String(120), nullable=False)
+    venue_state = db.Column(db.String(120), nullable=False)
+    venue_image_link = db.Column(db.String(500), nullable=False)
+    artist_id = db.Column(db.Integer, nullable=False)
+    artist_name = db.Column(db.String, nullable=False)
+    artist_image_link = db.Column(db.String(500), nullable=False)
+    # latest updated_at of the show, venue and artist
+    updated_at = db.Column(db.DateTime, nullable=False)
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
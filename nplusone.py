@@ -0,0 +1,88 @@
+import os
+import re
+import traceback
+from collections import Counter
+
+#----------------------------------------------------------------------------#
+# N+1 query detection.
+#
+# Each statement a request runs is reduced to a fingerprint: its SQL with
+# literals and expanded IN lists collapsed, so the same query for another
+# id has the same fingerprint. A fingerprint running more than
+# NPLUSONE_THRESHOLD times in one request almost always means a query inside
+# a Python loop. The call site (the innermost frames of this app's own code)
+# is captured when the threshold is crossed, and the request then either
+# fails with NPlusOneError (NPLUSONE_MODE 'raise', the default under
+# TESTING) or logs a warning ('warn', for staging). 'off' disables tracking.
+#----------------------------------------------------------------------------#
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+IGNORED_FILES = {os.path.join(ROOT, name) for name in ('nplusone.py', 'profiling.py')}
+
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r'\b\d+(?:\.\d+)?\b')
+_placeholder = re.compile(r'\?|%\(\w+\)s|%s|\$\d+|:\w+')
+_value_list = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+class NPlusOneError(Exception):
+    """A request ran the same statement more than NPLUSONE_THRESHOLD times."""
+
+def fingerprint(statement):
+    statement = _string.sub('?', statement)
+    statement = _placeholder.sub('?', statement)
+    statement = _number.sub('?', statement)
+    statement = _value_list.sub('(?)', statement)
+    return ' '.join(statement.split())
+
+def call_site(depth=3):
+    """Return the innermost frames of app code, e.g.
+    'queries.py:23 in show_counts < app.py:140 in venues'."""
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith('<'):
+            continue
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(ROOT + os.sep) and filename not in IGNORED_FILES \
+                and 'site-packages' not in filename:
+            frames.append('{}:{} in {}'.format(os.path.relpath(filename, ROOT), frame.lineno, frame.name))
+            if len(frames) == depth:
+                break
+    return ' < '.join(frames) or '<unknown>'
+
+class RepeatTracker(object):
+    """Counts fingerprints for one request."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.sites = {}
+
+    def record(self, statement):
+        key = fingerprint(statement)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.sites[key] = call_site()
+
+    def offenders(self):
+        """[(count, fingerprint, call site)], most repeated first."""
+        return sorted(((self.counts[key], key, site) for key, site in self.sites.items()),
+                      reverse=True)
+
+def mode(app):
+    return app.config.get('NPLUSONE_MODE') or ('raise' if app.testing else 'off')
+
+def report(offenders, endpoint):
+    lines = ['{} ran repeated statements:'.format(endpoint)]
+    for count, key, site in offenders:
+        lines.append('  {}x at {}: {}'.format(count, site, key[:200]))
+    return '\n'.join(lines)
+
+def check(app, tracker, endpoint):
+    """Warn about or raise for the statements tracker saw repeated."""
+    offenders = tracker.offenders()
+    if not offenders:
+        return
+    message = report(offenders, endpoint)
+    if mode(app) == 'raise':
+        raise NPlusOneError(message)
+    app.logger.warning(message)
@@ -0,0 +1,255 @@
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import abort, current_app, g, has_app_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import nplusone
+
+#----------------------------------------------------------------------------#
+# Per-request profiling.
+#
+# Every request records its SQL statements (count, total time and the
+# slowest few, from engine events on every engine, replicas included) and
+# the time spent rendering each template. When it ends the profile is:
+#   - sent back as Server-Timing / X-SQL-* headers when PROFILE_HEADERS is on
+#     (the default in debug),
+#   - logged as one JSON line on the 'fyyur.requests' logger (REQUEST_LOG),
+#   - folded into per-route Prometheus histograms served at /metrics
+#     (METRICS_ENABLED, the default in debug; METRICS_TOKEN requires a
+#     bearer token to read them).
+# Metrics are kept per process, so every series carries a pid label; under
+# gunicorn, scrape each worker and sum over pid when querying.
+# Streamed responses (stream_template, exports) are profiled up to the
+# first byte only. Statements repeated within a request are reported by
+# nplusone.py.
+#----------------------------------------------------------------------------#
+
+request_log = logging.getLogger('fyyur.requests')
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+STATEMENT_PREVIEW = 200
+
+class RequestProfile(object):
+
+    def __init__(self, slow_count=3, repeats=None):
+        self.started = time.perf_counter()
+        # a nplusone.RepeatTracker, when N+1 detection is on
+        self.repeats = repeats
+        self.slow_count = slow_count
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.slowest = []
+        self.templates = []
+
+    def record_sql(self, statement, elapsed):
+        self.sql_count += 1
+        self.sql_time += elapsed
+        if self.repeats is not None:
+            self.repeats.record(statement)
+        if len(self.slowest) < self.slow_count or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, ' '.join(statement.split())[:STATEMENT_PREVIEW]))
+            self.slowest.sort(key=lambda item: -item[0])
+            del self.slowest[self.slow_count:]
+
+    def record_render(self, name, elapsed):
+        self.templates.append((name, elapsed))
+
+    @property
+    def render_time(self):
+        return sum(elapsed for _, elapsed in self.templates)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+def current_profile():
+    """Return the current request's RequestProfile, or None."""
+    return g.get('profile') if has_app_context() else None
+
+#----------------------------------------------------------------------------#
+# Collection.
+#----------------------------------------------------------------------------#
+
+# The start time lives on the statement's execution context, which is
+# discarded with it, so a statement that fails leaves nothing behind.
+# (Internal statements such as sequence prefetches have no context and go
+# unrecorded.)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profile_started', None)
+    profile = current_profile()
+    if profile is not None and started is not None:
+        profile.record_sql(statement, time.perf_counter() - started)
+
+event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+class TimedTemplate(Template):
+    """Records render time on the current profile. Included and extended
+    templates are counted in the template that renders them."""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return Template.render(self, *args, **kwargs)
+        finally:
+            profile = current_profile()
+            if profile is not None:
+                profile.record_render(self.name, time.perf_counter() - started)
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+class Histogram(object):
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def expose(self, label_names, extra):
+        lines = ['# HELP {} {}'.format(self.name, self.help), '# TYPE {} histogram'.format(self.name)]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = list(zip(label_names, labels)) + list(extra)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{} {}'.format(self.name, _labels(base, [('le', bound)]), cumulative))
+            lines.append('{}_bucket{} {}'.format(self.name, _labels(base, [('le', '+Inf')]), count))
+            lines.append('{}_sum{} {}'.format(self.name, _labels(base), total))
+            lines.append('{}_count{} {}'.format(self.name, _labels(base), count))
+        return lines
+
+def _labels(*pairs):
+    pairs = [pair for group in pairs for pair in group]
+    if not pairs:
+        return ''
+    text = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in pairs)
+    return '{' + text + '}'
+
+class Metrics(object):
+    """Request metrics of this process, exposed in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.latency = Histogram('fyyur_request_duration_seconds',
+                                 'Time to build a response, by route.', LATENCY_BUCKETS)
+        self.sql_time = Histogram('fyyur_request_sql_duration_seconds',
+                                  'Time spent in SQL per request, by route.', LATENCY_BUCKETS)
+        self.render_time = Histogram('fyyur_request_render_duration_seconds',
+                                     'Time spent rendering templates per request, by route.', LATENCY_BUCKETS)
+        self.sql_count = Histogram('fyyur_request_sql_statements',
+                                   'SQL statements per request, by route.', QUERY_COUNT_BUCKETS)
+
+    def observe(self, route, method, status, profile, elapsed):
+        labels = (route,)
+        with self.lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, elapsed)
+            self.sql_time.observe(labels, profile.sql_time)
+            self.render_time.observe(labels, profile.render_time)
+            self.sql_count.observe(labels, profile.sql_count)
+
+    def expose(self):
+        extra = [('pid', os.getpid())]
+        with self.lock:
+            lines = ['# HELP fyyur_requests_total Requests served, by route, method and status.',
+                     '# TYPE fyyur_requests_total counter']
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append('fyyur_requests_total{} {}'.format(
+                    _labels([('route', route), ('method', method), ('status', status)], extra), count))
+            for histogram in (self.latency, self.sql_time, self.render_time, self.sql_count):
+                lines.extend(histogram.expose(('route',), extra))
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+#----------------------------------------------------------------------------#
+# Request hooks.
+#----------------------------------------------------------------------------#
+
+def _route():
+    # the URL rule, not the path, so ids don't multiply the series
+    rule = request.url_rule
+    return rule.rule if rule is not None else '<unmatched>'
+
+def _server_timing(profile, elapsed):
+    return 'sql;dur={:.1f};desc="{} queries", render;dur={:.1f}, total;dur={:.1f}'.format(
+        profile.sql_time * 1000, profile.sql_count, profile.render_time * 1000, elapsed * 1000)
+
+def _log_line(profile, response, elapsed):
+    return json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2),
+        'sql_count': profile.sql_count,
+        'sql_ms': round(profile.sql_time * 1000, 2),
+        'slowest_sql': [{'ms': round(took * 1000, 2), 'statement': statement}
+                        for took, statement in profile.slowest],
+        'render_ms': {name: round(took * 1000, 2) for name, took in profile.templates},
+    }, separators=(',', ':'))
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + token):
+        abort(401)
+    return current_app.response_class(metrics.expose(), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    app.jinja_env.template_class = TimedTemplate
+    if app.config.get('METRICS_ENABLED', app.debug):
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    @app.before_request
+    def start_profile():
+        repeats = None
+        if nplusone.mode(app) != 'off':
+            repeats = nplusone.RepeatTracker(app.config.get('NPLUSONE_THRESHOLD', 5))
+        g.profile = RequestProfile(app.config.get('PROFILE_SLOW_QUERIES', 3), repeats)
+
+    @app.after_request
+    def finish_profile(response):
+        # asgi.py renders without before_request hooks, profiled or not
+        profile = g.get('profile')
+        if profile is None or request.endpoint == 'metrics':
+            return response
+        elapsed = profile.elapsed()
+        if app.config.get('PROFILE_HEADERS', app.debug):
+            response.headers['Server-Timing'] = _server_timing(profile, elapsed)
+            response.headers['X-SQL-Count'] = str(profile.sql_count)
+            response.headers['X-SQL-Time-Ms'] = '{:.1f}'.format(profile.sql_time * 1000)
+        if app.config.get('REQUEST_LOG', not app.debug):
+            request_log.info(_log_line(profile, response, elapsed))
+        if app.config.get('METRICS_ENABLED', app.debug):
+            metrics.observe(_route(), request.method, response.status_code, profile, elapsed)
+        if profile.repeats is not None:
+            nplusone.check(app, profile.repeats, request.endpoint)
+        return response
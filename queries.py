@@ -0,0 +1,348 @@
+import base64
+from datetime import datetime
+from itertools import groupby
+from sqlalchemy import func, tuple_
+from models import db, Venue, Artist, Show, UpcomingShow
+from genres import has_genre
+
+#----------------------------------------------------------------------------#
+# Data access for the venue and artist pages.
+#
+# Each loader runs a fixed number of statements no matter how many shows the
+# venue or artist has: the entity itself, one aggregate for the past and
+# upcoming counts, and one bounded, database-ordered list per side.
+#----------------------------------------------------------------------------#
+
+DEFAULT_SHOW_LIMIT = 50
+
+def show_counts(criterion, now):
+    """Return (past_count, upcoming_count) for the shows matching criterion."""
+    return db.session.query(
+        func.count(Show.id).filter(Show.start_time < now),
+        func.count(Show.id).filter(Show.start_time >= now),
+    ).filter(criterion).one()
+
+def past_and_upcoming(query, now, limit):
+    """Split a show query into (past, upcoming) row lists.
+
+    Past shows come newest first and upcoming shows soonest first, each side
+    capped at limit rows.
+    """
+    past = query.filter(Show.start_time < now) \
+        .order_by(Show.start_time.desc(), Show.id.desc()) \
+        .limit(limit).all()
+    upcoming = query.filter(Show.start_time >= now) \
+        .order_by(Show.start_time, Show.id) \
+        .limit(limit).all()
+    return past, upcoming
+
+def _venue_show_data(row):
+    return {
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    }
+
+def _artist_show_data(row):
+    return {
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'venue_image_link': row.venue_image_link,
+        'start_time': row.start_time
+    }
+
+def venue_page(venue_id, now=None, limit=DEFAULT_SHOW_LIMIT):
+    """Return the template data for a venue page, or None if it doesn't exist."""
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+    if now is None:
+        now = datetime.now()
+
+    past_count, upcoming_count = show_counts(Show.venue_id == venue_id, now)
+    shows = db.session.query(
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Show.start_time,
+    ).join(Show.artist).filter(Show.venue_id == venue_id)
+    past_shows, upcoming_shows = past_and_upcoming(shows, now, limit)
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": [_venue_show_data(row) for row in past_shows],
+        "upcoming_shows": [_venue_show_data(row) for row in upcoming_shows],
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+    }
+
+def artist_page(artist_id, now=None, limit=DEFAULT_SHOW_LIMIT):
+    """Return the template data for an artist page, or None if it doesn't exist."""
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+    if now is None:
+        now = datetime.now()
+
+    past_count, upcoming_count = show_counts(Show.artist_id == artist_id, now)
+    shows = db.session.query(
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        Show.start_time,
+    ).join(Show.venue).filter(Show.artist_id == artist_id)
+    past_shows, upcoming_shows = past_and_upcoming(shows, now, limit)
+
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": [_artist_show_data(row) for row in past_shows],
+        "upcoming_shows": [_artist_show_data(row) for row in upcoming_shows],
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+    }
+
+def artist_ids_for_venue(venue_id):
+    """Ids of the artists with at least one show at venue_id."""
+    rows = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return [row.artist_id for row in rows]
+
+def venue_ids_for_artist(artist_id):
+    """Ids of the venues with at least one show by artist_id."""
+    rows = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return [row.venue_id for row in rows]
+
+#----------------------------------------------------------------------------#
+# Venue listing.
+#----------------------------------------------------------------------------#
+
+def _listing_data(row):
+    # counters are denormalized onto the row by counters.py
+    return {
+        'id': row.id,
+        'name': row.name,
+        'upcoming_shows_count': row.upcoming_shows_count,
+        'next_show_time': row.next_show_time,
+        # counters.py bumps updated_at along with the counters
+        'updated_at': row.updated_at,
+    }
+
+def venue_areas(genre=None, state=None, seeking_talent=None):
+    """Return venues grouped by (state, city), in one ordered query.
+
+    The ordering matches the ix_Venue_state_city_name index, so rows stream
+    out already grouped and each area's venues come sorted by name. genre,
+    state and seeking_talent optionally narrow the listing.
+    """
+    rows = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state,
+                            Venue.upcoming_shows_count, Venue.next_show_time, Venue.updated_at)
+    if genre is not None:
+        rows = rows.filter(has_genre(Venue.genres, genre))
+    if state is not None:
+        rows = rows.filter(Venue.state == state)
+    if seeking_talent is not None:
+        rows = rows.filter(Venue.seeking_talent == seeking_talent)
+    rows = rows.order_by(Venue.state, Venue.city, Venue.name, Venue.id)
+
+    areas = []
+    for (state, city), venues in groupby(rows, key=lambda row: (row.state, row.city)):
+        areas.append({
+            'city': city,
+            'state': state,
+            'venues': [_listing_data(row) for row in venues]
+        })
+    return areas
+
+#----------------------------------------------------------------------------#
+# Artist listing.
+#----------------------------------------------------------------------------#
+
+def artist_list(genre=None, state=None, seeking_venue=None):
+    """Return [{'id', 'name', ...}, ...] for artists, optionally filtered."""
+    rows = db.session.query(Artist.id, Artist.name,
+                            Artist.upcoming_shows_count, Artist.next_show_time, Artist.updated_at)
+    if genre is not None:
+        rows = rows.filter(has_genre(Artist.genres, genre))
+    if state is not None:
+        rows = rows.filter(Artist.state == state)
+    if seeking_venue is not None:
+        rows = rows.filter(Artist.seeking_venue == seeking_venue)
+    rows = rows.order_by(Artist.name, Artist.id)
+    return [_listing_data(row) for row in rows]
+
+#----------------------------------------------------------------------------#
+# Shows feed.
+#
+# Keyset pagination on (start_time, id): each page continues strictly after
+# the last row of the previous one, so deep pages cost the same as the first.
+#----------------------------------------------------------------------------#
+
+DEFAULT_FEED_PAGE_SIZE = 30
+
+def encode_cursor(start_time, show_id):
+    raw = '{}|{}'.format(start_time.isoformat(), show_id)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (start_time, id) for a cursor, raising ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_time, show_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(start_time), int(show_id)
+    except ValueError as e:
+        raise ValueError('invalid cursor: {!r}'.format(cursor)) from e
+
+def _row_version(row):
+    if 'venue_updated_at' in row._fields:
+        return max(row.updated_at, row.venue_updated_at, row.artist_updated_at)
+    return row.updated_at
+
+def shows_feed(page_size=DEFAULT_FEED_PAGE_SIZE, after=None, upcoming=False,
+               start=None, end=None, venue_id=None, artist_id=None, now=None):
+    """Return (rows, next_cursor) for one page of the shows feed.
+
+    after is a cursor from a previous page. start and end bound start_time
+    (end exclusive); upcoming hides shows that already started and reads
+    from UpcomingShow. next_cursor is None on the last page.
+    """
+    if upcoming:
+        # served from the precomputed relation; no joins needed
+        source = UpcomingShow
+        query = db.session.query(
+            UpcomingShow.id,
+            UpcomingShow.start_time,
+            UpcomingShow.venue_id,
+            UpcomingShow.venue_name,
+            UpcomingShow.artist_id,
+            UpcomingShow.artist_name,
+            UpcomingShow.artist_image_link,
+            UpcomingShow.updated_at,
+        ).filter(UpcomingShow.start_time >= (now or datetime.now()))
+    else:
+        source = Show
+        query = db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.venue_id,
+            Venue.name.label('venue_name'),
+            Show.artist_id,
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            Show.updated_at,
+            Venue.updated_at.label('venue_updated_at'),
+            Artist.updated_at.label('artist_updated_at'),
+        ).join(Show.venue).join(Show.artist)
+
+    if start is not None:
+        query = query.filter(source.start_time >= start)
+    if end is not None:
+        query = query.filter(source.start_time < end)
+    if venue_id is not None:
+        query = query.filter(source.venue_id == venue_id)
+    if artist_id is not None:
+        query = query.filter(source.artist_id == artist_id)
+    if after is not None:
+        query = query.filter(tuple_(source.start_time, source.id) > decode_cursor(after))
+
+    rows = query.order_by(source.start_time, source.id).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+
+    shows = [{
+        'id': row.id,
+        # what the show's tile depends on, for fragment caching
+        'version': _row_version(row),
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time
+    } for row in rows]
+    return shows, next_cursor
+
+def next_shows(limit, now=None):
+    """Return the next limit shows to start, for the home page."""
+    rows = db.session.query(
+        UpcomingShow.start_time,
+        UpcomingShow.venue_id,
+        UpcomingShow.venue_name,
+        UpcomingShow.artist_id,
+        UpcomingShow.artist_name,
+    ).filter(UpcomingShow.start_time >= (now or datetime.now())) \
+        .order_by(UpcomingShow.start_time, UpcomingShow.id).limit(limit)
+    return [row._asdict() for row in rows]
+
+#----------------------------------------------------------------------------#
+# Page versions.
+#
+# Cheap summaries of everything a page depends on, used as conditional GET
+# validators. Each returns its summary from one aggregate statement. Row
+# counts catch deletes, and the upcoming count changes as shows move into
+# the past; no single timestamp does, so pages carry no Last-Modified.
+#----------------------------------------------------------------------------#
+
+def _history_version(model, show_fk, other, other_fk, entity_id, now):
+    row = db.session.query(
+        model.updated_at,
+        func.count(Show.id),
+        func.count(Show.id).filter(Show.start_time >= now),
+        func.max(Show.updated_at),
+        func.max(other.updated_at),
+    ).select_from(model) \
+        .outerjoin(Show, show_fk == model.id) \
+        .outerjoin(other, other.id == other_fk) \
+        .filter(model.id == entity_id) \
+        .group_by(model.id, model.updated_at).first()
+    if row is None:
+        return None
+    return tuple(row)
+
+def venue_page_version(venue_id, now=None):
+    return _history_version(Venue, Show.venue_id, Artist, Show.artist_id,
+                            venue_id, now or datetime.now())
+
+def artist_page_version(artist_id, now=None):
+    return _history_version(Artist, Show.artist_id, Venue, Show.venue_id,
+                            artist_id, now or datetime.now())
+
+def listing_version(model):
+    row = db.session.query(func.count(model.id), func.max(model.updated_at)).one()
+    return tuple(row)
+
+def shows_feed_version(now=None):
+    now = now or datetime.now()
+    row = db.session.query(
+        func.count(Show.id),
+        func.count(Show.id).filter(Show.start_time >= now),
+        func.max(Show.updated_at),
+        db.session.query(func.max(Venue.updated_at)).scalar_subquery(),
+        db.session.query(func.max(Artist.updated_at)).scalar_subquery(),
+        # the upcoming feed changes when the relation is refreshed
+        db.session.query(func.count(UpcomingShow.id)).scalar_subquery(),
+        db.session.query(func.max(UpcomingShow.updated_at)).scalar_subquery(),
+    ).one()
+    return tuple(row)
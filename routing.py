@@ -0,0 +1,79 @@
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#
+# Views marked @read_only run their queries on a replica picked once per
+# request (from REPLICA_BINDS); everything else, and anything flushed, goes
+# to the primary. After a request writes, the client is pinned to the
+# primary for REPLICA_STICKY_SECONDS so it reads its own writes even while
+# the replicas catch up.
+#----------------------------------------------------------------------------#
+
+STICKY_SESSION_KEY = '_primary_until'
+
+def _pinned_to_primary():
+    return has_request_context() and session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+def _replica_engine():
+    if g.get('db_replica') is None:
+        app = current_app._get_current_object()
+        names = app.config.get('REPLICA_BINDS')
+        if not names or _pinned_to_primary():
+            g.db_replica = False
+        else:
+            db = app.extensions['sqlalchemy'].db
+            g.db_replica = db.get_engine(app, bind=random.choice(names))
+    return g.db_replica or None
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self._flushing and has_app_context() and g.get('db_read_only'):
+            engine = _replica_engine()
+            if engine is not None:
+                return engine
+        return SignallingSession.get_bind(self, mapper, clause)
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+def _mark_write(*args):
+    if has_app_context():
+        g.db_wrote = True
+
+event.listen(RoutingSession, 'after_flush', _mark_write)
+event.listen(RoutingSession, 'after_bulk_update', _mark_write)
+event.listen(RoutingSession, 'after_bulk_delete', _mark_write)
+
+def read_only(view):
+    """Serve a view's queries from a replica when one is configured."""
+    @wraps(view)
+    def wrapper(**kwargs):
+        g.db_read_only = True
+        return view(**kwargs)
+    return wrapper
+
+def current_route():
+    """Return the current request's routing, to carry into worker threads."""
+    if not g.get('db_read_only'):
+        return False, None
+    return True, _replica_engine()
+
+def restore_route(route):
+    g.db_read_only, replica = route
+    g.db_replica = replica or False
+
+def init_app(app):
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            session[STICKY_SESSION_KEY] = time.time() + app.config.get('REPLICA_STICKY_SECONDS', 10)
+        return response
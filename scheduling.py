@@ -0,0 +1,120 @@
+from collections import namedtuple
+from sqlalchemy import DateTime, Integer, and_, literal, select, union_all
+from models import db, Venue, Artist, Show, DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#
+# A show occupies its venue and its artist over [start_time, end_time). Two
+# shows conflict when they share a venue or an artist and their intervals
+# overlap. Since no show runs longer than MAX_SHOW_DURATION, the shows that
+# can overlap a slot all start within (start - MAX_SHOW_DURATION, end), a
+# single range seek on the (venue_id, start_time) / (artist_id, start_time)
+# indexes. On Postgres, exclusion constraints over the same intervals back
+# this up against concurrent bookings.
+#
+# Up to MAX_SLOTS candidate slots are checked in one call: one lookup per
+# model confirms the venue and artist ids exist, then the slots become a
+# literal CTE joined against Show, SLOTS_PER_QUERY at a time so a query stays
+# within SQLite's limits (999 bound parameters, 500 compound SELECT terms).
+#----------------------------------------------------------------------------#
+
+MAX_SLOTS = 500
+# each slot binds 6 parameters and adds one SELECT to the CTE's UNION ALL
+SLOTS_PER_QUERY = 100
+
+Slot = namedtuple('Slot', 'venue_id artist_id start_time end_time')
+
+def make_slot(venue_id, artist_id, start_time, duration=None):
+    """Build a Slot; duration is a timedelta, defaulting to DEFAULT_SHOW_DURATION."""
+    duration = duration or DEFAULT_SHOW_DURATION
+    if duration > MAX_SHOW_DURATION:
+        raise ValueError('shows may not run longer than {}'.format(MAX_SHOW_DURATION))
+    return Slot(venue_id, artist_id, start_time, start_time + duration)
+
+def _slots_cte(slots, offset=0):
+    return union_all(*[
+        select(
+            literal(offset + i, Integer).label('slot'),
+            literal(slot.venue_id, Integer).label('venue_id'),
+            literal(slot.artist_id, Integer).label('artist_id'),
+            literal(slot.start_time, DateTime).label('start_time'),
+            literal(slot.end_time, DateTime).label('end_time'),
+            literal(slot.start_time - MAX_SHOW_DURATION, DateTime).label('window_start'),
+        ) for i, slot in enumerate(slots)
+    ]).cte('slots')
+
+def _overlaps(slots, key):
+    # key is 'venue_id' or 'artist_id'
+    return select(slots.c.slot, Show.id).join(Show, and_(
+        getattr(Show, key) == slots.c[key],
+        Show.start_time > slots.c.window_start,
+        Show.start_time < slots.c.end_time,
+        Show.end_time > slots.c.start_time,
+    ))
+
+def _existing(model, ids):
+    ids = {key for key in ids if key is not None}
+    if not ids:
+        return set()
+    return {row.id for row in db.session.query(model.id).filter(model.id.in_(ids))}
+
+def check_slots(slots):
+    """Check candidate slots against the schedule.
+
+    Returns one {'available', 'conflicts', 'errors'} dict per slot, in
+    order: conflicts lists the ids of overlapping shows, errors any missing
+    venue or artist. Slots are checked against existing shows only, not
+    against each other.
+    """
+    if not slots:
+        return []
+    if len(slots) > MAX_SLOTS:
+        raise ValueError('at most {} slots can be checked at once'.format(MAX_SLOTS))
+
+    venues = _existing(Venue, [slot.venue_id for slot in slots])
+    artists = _existing(Artist, [slot.artist_id for slot in slots])
+    results = [{'available': True, 'conflicts': [], 'errors': []} for _ in slots]
+    for slot, result in zip(slots, results):
+        if slot.venue_id not in venues:
+            result['errors'].append('venue {} does not exist'.format(slot.venue_id))
+        if slot.artist_id not in artists:
+            result['errors'].append('artist {} does not exist'.format(slot.artist_id))
+
+    for offset in range(0, len(slots), SLOTS_PER_QUERY):
+        cte = _slots_cte(slots[offset:offset + SLOTS_PER_QUERY], offset)
+        rows = db.session.execute(
+            union_all(_overlaps(cte, 'venue_id'), _overlaps(cte, 'artist_id')))
+        for index, show_id in rows:
+            if show_id not in results[index]['conflicts']:
+                results[index]['conflicts'].append(show_id)
+
+    for result in results:
+        result['conflicts'].sort()
+        result['available'] = not result['conflicts'] and not result['errors']
+    return results
+
+def check_slot(slot):
+    return check_slots([slot])[0]
+
+def overlapping_within(slots, rejected=()):
+    """Return the indexes of slots overlapping an earlier-starting slot kept.
+
+    Used to reject clashes inside a batch of new shows: slots are taken in
+    start order and each one kept books its venue and artist, so a slot
+    dropped here or listed in rejected (e.g. for an existing conflict) never
+    blocks a later one.
+    """
+    clashes = set()
+    busy_until = {}
+    for i in sorted(range(len(slots)), key=lambda i: (slots[i].start_time, i)):
+        if i in rejected:
+            continue
+        slot = slots[i]
+        owners = (('venue', slot.venue_id), ('artist', slot.artist_id))
+        if any(slot.start_time < busy_until.get(owner, slot.start_time) for owner in owners):
+            clashes.add(i)
+            continue
+        for owner in owners:
+            busy_until[owner] = slot.end_time
+    return clashes
@@ -0,0 +1,301 @@
+import heapq
+import queue
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from sqlalchemy import event, func, literal, or_
+from sqlalchemy.orm import Session
+from flask import current_app
+from models import db, Venue, Artist
+import routing
+
+#----------------------------------------------------------------------------#
+# Venue and artist search.
+#
+# On Postgres, search runs against the trigger-maintained search_vector
+# columns (GIN indexed) for ranked prefix matches on name, city, state and
+# genres, plus pg_trgm similarity on the name so typos still find a hit.
+# Other databases use an in-process inverted index with the same behaviour,
+# dropped when a write to venues or artists commits and rebuilt lazily.
+#----------------------------------------------------------------------------#
+
+DEFAULT_LIMIT = 20
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    return _token_re.findall((text or '').lower())
+
+def _prefix_tsquery(terms):
+    return ' & '.join('{}:*'.format(term) for term in terms)
+
+def _postgres_query(model, term, *columns):
+    terms = tokenize(term)
+    if not terms:
+        return db.session.query(model.id, model.name, literal(0.0).label('score'), *columns) \
+            .order_by(model.name, model.id)
+
+    tsquery = func.to_tsquery('simple', _prefix_tsquery(terms))
+    rank = func.ts_rank_cd(model.search_vector, tsquery) + func.similarity(model.name, term)
+    return db.session.query(model.id, model.name, rank.label('score'), *columns) \
+        .filter(or_(
+            model.search_vector.op('@@')(tsquery),
+            model.name.op('%')(term)
+        )).order_by(rank.desc(), model.name, model.id)
+
+def _postgres_search(model, term, limit):
+    rows = _postgres_query(model, term, func.count().over().label('total')).limit(limit).all()
+    return {
+        'count': rows[0].total if rows else 0,
+        'data': [{'id': row.id, 'name': row.name} for row in rows]
+    }
+
+#----------------------------------------------------------------------------#
+# In-process fallback.
+#----------------------------------------------------------------------------#
+
+# Field weights, mirroring the A/B/C weights set by the Postgres trigger.
+NAME_WEIGHT = 1.0
+PLACE_WEIGHT = 0.4
+GENRE_WEIGHT = 0.2
+
+PREFIX_FACTOR = 0.8
+FUZZY_THRESHOLD = 0.3
+
+def _trigrams(token):
+    padded = '  {} '.format(token)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _similarity(a, b):
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+class InvertedIndex(object):
+    """Token -> document postings with prefix and trigram lookup."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.names = {}
+        self.vocabulary = []
+        self.trigrams = defaultdict(set)
+
+    def add(self, doc_id, name, fields):
+        """Index a document; fields is a list of (text, weight) pairs."""
+        self.names[doc_id] = name
+        for text, weight in fields:
+            for token in tokenize(text):
+                postings = self.postings[token]
+                postings[doc_id] = max(postings.get(doc_id, 0), weight)
+
+    def freeze(self):
+        self.vocabulary = sorted(self.postings)
+        for token in self.vocabulary:
+            for trigram in _trigrams(token):
+                self.trigrams[trigram].add(token)
+
+    def _expand(self, term):
+        """Yield (token, factor) for every indexed token matching term."""
+        matched = set()
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            token = self.vocabulary[i]
+            matched.add(token)
+            yield token, 1.0 if token == term else PREFIX_FACTOR
+            i += 1
+
+        candidates = set()
+        for trigram in _trigrams(term):
+            candidates |= self.trigrams.get(trigram, set())
+        for token in candidates - matched:
+            similarity = _similarity(term, token)
+            if similarity >= FUZZY_THRESHOLD:
+                yield token, similarity * PREFIX_FACTOR
+
+    def ranked(self, term):
+        """Return [(doc_id, score), ...] best first; every word must match."""
+        terms = tokenize(term)
+        if not terms:
+            ids = sorted(self.names, key=lambda doc_id: (self.names[doc_id], doc_id))
+            return [(doc_id, 0.0) for doc_id in ids]
+
+        scores = None
+        for word in terms:
+            term_scores = {}
+            for token, factor in self._expand(word):
+                for doc_id, weight in self.postings[token].items():
+                    term_scores[doc_id] = max(term_scores.get(doc_id, 0), weight * factor)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id]
+                          for doc_id, score in scores.items() if doc_id in term_scores}
+
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], self.names[doc_id], doc_id))
+        return [(doc_id, scores[doc_id]) for doc_id in ranked]
+
+    def search(self, term, limit):
+        ranked = self.ranked(term)
+        return len(ranked), [(doc_id, self.names[doc_id]) for doc_id, _ in ranked[:limit]]
+
+_indexes = {}
+# bumped on every invalidation, so a rebuild that raced one isn't kept
+_generations = defaultdict(int)
+
+def _build_index(model):
+    index = InvertedIndex()
+    rows = db.session.query(model.id, model.name, model.city, model.state, model.genres)
+    for row in rows:
+        index.add(row.id, row.name, [
+            (row.name, NAME_WEIGHT),
+            ('{} {}'.format(row.city, row.state), PLACE_WEIGHT),
+            (' '.join(row.genres or []), GENRE_WEIGHT),
+        ])
+    index.freeze()
+    return index
+
+def _local_index(model):
+    index = _indexes.get(model)
+    if index is None:
+        generation = _generations[model]
+        index = _build_index(model)
+        if _generations[model] == generation:
+            _indexes[model] = index
+    return index
+
+def _local_search(model, term, limit):
+    count, hits = _local_index(model).search(term, limit)
+    return {
+        'count': count,
+        'data': [{'id': doc_id, 'name': name} for doc_id, name in hits]
+    }
+
+def _invalidate(models):
+    for model in models:
+        _generations[model] += 1
+        _indexes.pop(model, None)
+
+def invalidate_local_indexes():
+    """Drop the in-process indexes, e.g. after writes that bypass the ORM."""
+    _invalidate((Venue, Artist))
+
+# Writes are noted during the flush but only drop the index once committed;
+# a search rebuilding in between would otherwise cache the old rows again.
+
+def _record(mapper, connection, target):
+    Session.object_session(target).info.setdefault('search', set()).add(type(target))
+
+def _record_bulk(context):
+    if context.mapper.class_ in (Venue, Artist):
+        context.session.info.setdefault('search', set()).add(context.mapper.class_)
+
+def _after_commit(session):
+    _invalidate(session.info.pop('search', ()))
+
+def _after_rollback(session):
+    session.info.pop('search', None)
+
+for _model in (Venue, Artist):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _record)
+event.listen(Session, 'after_bulk_update', _record_bulk)
+event.listen(Session, 'after_bulk_delete', _record_bulk)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
+
+#----------------------------------------------------------------------------#
+# Public interface.
+#----------------------------------------------------------------------------#
+
+def _search(model, term, limit):
+    if db.engine.dialect.name == 'postgresql':
+        return _postgres_search(model, term, limit)
+    return _local_search(model, term, limit)
+
+def search_venues(term, limit=DEFAULT_LIMIT):
+    """Return {'count': total matches, 'data': [{'id', 'name'}, ...]}."""
+    return _search(Venue, term, limit)
+
+def search_artists(term, limit=DEFAULT_LIMIT):
+    """Return {'count': total matches, 'data': [{'id', 'name'}, ...]}."""
+    return _search(Artist, term, limit)
+
+#----------------------------------------------------------------------------#
+# Unified search.
+#
+# Venues and artists are searched concurrently, each in a worker thread that
+# streams hits (server-side cursor on Postgres) into a bounded queue. The
+# consumer merges both queues by score as hits arrive, so the best matches
+# are available before either query finishes and memory stays at a few
+# batches regardless of how many rows match.
+#----------------------------------------------------------------------------#
+
+STREAM_BATCH_SIZE = 200
+
+_done = object()
+
+def _iter_hits(model, term, batch_size):
+    """Yield (score, name, id) for every match, best first."""
+    if db.engine.dialect.name == 'postgresql':
+        rows = _postgres_query(model, term) \
+            .execution_options(stream_results=True).yield_per(batch_size)
+        for row in rows:
+            yield float(row.score), row.name, row.id
+    else:
+        index = _local_index(model)
+        for doc_id, score in index.ranked(term):
+            yield score, index.names[doc_id], doc_id
+
+def _put(out, item, stop):
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _produce(app, route, model, term, out, stop, batch_size):
+    with app.app_context():
+        routing.restore_route(route)
+        try:
+            for hit in _iter_hits(model, term, batch_size):
+                if not _put(out, hit, stop):
+                    return
+        except Exception as e:
+            _put(out, e, stop)
+        finally:
+            _put(out, _done, stop)
+
+def _consume(entity_type, out):
+    while True:
+        item = out.get()
+        if item is _done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        score, name, doc_id = item
+        yield {'type': entity_type, 'id': doc_id, 'name': name, 'score': score}
+
+def search_all(term, batch_size=STREAM_BATCH_SIZE):
+    """Yield {'type', 'id', 'name', 'score'} for venues and artists, best first.
+
+    Must be consumed inside an app context (use stream_with_context when
+    streaming a response); closing the generator stops the workers.
+    """
+    app = current_app._get_current_object()
+    route = routing.current_route()
+    stop = threading.Event()
+    streams = []
+    for entity_type, model in (('venue', Venue), ('artist', Artist)):
+        out = queue.Queue(maxsize=batch_size)
+        worker = threading.Thread(target=_produce, args=(app, route, model, term, out, stop, batch_size))
+        worker.daemon = True
+        worker.start()
+        streams.append(_consume(entity_type, out))
+
+    try:
+        for hit in heapq.merge(*streams, key=lambda hit: -hit['score']):
+            yield hit
+    finally:
+        stop.set()
@@ -19,3 +19,35 @@ venueDeleteButtons.forEach(button => {
       })
   }
 });
+
+// Name pickers on the show form: suggest names as the user types and copy
+// the id of the chosen one into the id field
+document.querySelectorAll('[data-autocomplete]').forEach(input => {
+  const list = document.getElementById(input.getAttribute('list'));
+  const target = document.getElementById(input.dataset.target);
+  let ids = {};
+  let pending = null;
+  input.addEventListener('input', () => {
+    if (input.value in ids) {
+      target.value = ids[input.value];
+      return;
+    }
+    clearTimeout(pending);
+    pending = setTimeout(() => {
+      fetch(`${input.dataset.autocomplete}?q=${encodeURIComponent(input.value)}`)
+        .then(response => response.json())
+        .then(body => {
+          ids = {};
+          list.innerHTML = '';
+          body.data.forEach(item => {
+            const label = `${item.name} (#${item.id})`;
+            ids[label] = item.id;
+            const option = document.createElement('option');
+            option.value = label;
+            list.appendChild(option);
+          });
+        })
+        .catch(e => console.log(e));
+    }, 100);
+  });
+});
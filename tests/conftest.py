@@ -0,0 +1,74 @@
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py reads these at import; the suite runs on SQLite
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('SECRET_KEY', 'test')
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import autocomplete
+import search
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'app_config(**settings): override the test app config')
+
+@pytest.fixture
+def app(request, tmp_path):
+    marker = request.node.get_closest_marker('app_config')
+    app = create_app(dict({
+        'TESTING': True,
+        # fail any request that repeats a statement (nplusone.py)
+        'NPLUSONE_MODE': 'raise',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'WTF_CSRF_ENABLED': False,
+        'CACHE_TYPE': 'null',
+        'UPCOMING_REFRESH_DELAY': 0,
+        'REQUEST_LOG': False,
+        'ASSETS_BUNDLED': False,
+    }, **(marker.kwargs if marker else {})))
+    with app.app_context():
+        db.create_all()
+        # in-process indexes outlive the app; each test has a fresh database
+        search.invalidate_local_indexes()
+        autocomplete.invalidate()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def make_venue(**fields):
+    values = dict(name='The Musical Hop', city='San Francisco', state='CA', address='1015 Folsom Street',
+                  phone='123-123-1234', image_link='https://example.com/venue.jpg',
+                  facebook_link='https://www.facebook.com/TheMusicalHop', genres=['Jazz'])
+    values.update(fields)
+    venue = Venue(**values)
+    db.session.add(venue)
+    db.session.flush()
+    return venue
+
+def make_artist(**fields):
+    values = dict(name='Guns N Petals', city='San Francisco', state='CA', phone='326-123-5000',
+                  image_link='https://example.com/artist.jpg',
+                  facebook_link='https://www.facebook.com/GunsNPetals', genres=['Rock n Roll'])
+    values.update(fields)
+    artist = Artist(**values)
+    db.session.add(artist)
+    db.session.flush()
+    return artist
+
+def add_shows(venue, artist, count, now=None):
+    """Add count shows, half past and half upcoming, a day apart."""
+    now = now or datetime.now()
+    for i in range(count):
+        db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=now + timedelta(days=i - count // 2)))
+    db.session.commit()
@@ -0,0 +1,68 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+import pytest
+from api import encode_cursor
+from conftest import make_venue, make_artist, add_shows
+from models import db
+
+@pytest.mark.parametrize('values', [
+    [],
+    ['2035-04-01T20:30:00'],
+    ['2035-04-01T20:30:00', 1, 2],
+    {'start_time': '2035-04-01T20:30:00'},
+])
+def test_malformed_cursor_is_rejected(client, values):
+    venue = make_venue()
+    db.session.commit()
+    for path in ('/api/v1/shows', '/api/v1/venues/{}/shows'.format(venue.id)):
+        response = client.get(path, query_string={'after': encode_cursor(values)})
+        assert response.status_code == 400
+
+def walk(client, path, **params):
+    """Follow next cursors; returns every page's data."""
+    pages = []
+    while True:
+        body = client.get(path, query_string=params).get_json()
+        pages.append(body['data'])
+        if body['next'] is None:
+            return pages
+        params['after'] = body['next']
+
+def test_cursors_walk_every_row_once(client):
+    for i in range(5):
+        make_venue(name='Venue {}'.format(i))
+    db.session.commit()
+    pages = walk(client, '/api/v1/venues', limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [venue['name'] for page in pages for venue in page] == ['Venue {}'.format(i) for i in range(5)]
+
+def test_show_cursors_walk_past_shows_newest_first(client):
+    venue, artist = make_venue(), make_artist()
+    add_shows(venue, artist, 10, now=datetime.now() + timedelta(hours=1))
+    pages = walk(client, '/api/v1/venues/{}/shows'.format(venue.id), when='past', limit=2)
+    times = [show['start_time'] for page in pages for show in page]
+    assert len(times) == 5
+    assert times == sorted(times, reverse=True)
+
+def test_fields_select_columns(client):
+    make_venue(name='The Musical Hop', city='San Francisco')
+    db.session.commit()
+    body = client.get('/api/v1/venues', query_string={'fields': 'name,city'}).get_json()
+    assert body['data'] == [{'id': 1, 'name': 'The Musical Hop', 'city': 'San Francisco'}]
+
+    response = client.get('/api/v1/venues', query_string={'fields': 'name,password'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'unknown fields: password'}
+
+def test_large_responses_are_compressed(client):
+    for i in range(20):
+        make_venue(name='Venue {}'.format(i))
+    db.session.commit()
+    response = client.get('/api/v1/venues', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.data))['data']) == 20
+
+    small = client.get('/api/v1/venues', query_string={'limit': 1}, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from conftest import make_venue, make_artist, add_shows
+from models import db
+
+pytest.importorskip('asgiref')
+pytest.importorskip('aiosqlite')
+from asgi import AsyncApp
+
+def request(application, path):
+    """Run one GET through the ASGI app; returns (status, headers, body)."""
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+             'headers': [(b'host', b'localhost')], 'http_version': '1.1', 'scheme': 'http',
+             'root_path': '', 'server': ('localhost', 80), 'client': ('127.0.0.1', 1234)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+        await application.queries.engine.dispose()
+
+    asyncio.run(run())
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], dict(start['headers']), body
+
+def test_venue_page(app):
+    venue, artist = make_venue(name='Async Hall'), make_artist(name='Async Band')
+    add_shows(venue, artist, 4)
+    status, headers, body = request(AsyncApp(app), '/venues/{}'.format(venue.id))
+    assert status == 200
+    assert headers[b'content-type'].startswith(b'text/html')
+    assert b'Async Hall' in body and b'Async Band' in body
+
+def test_missing_venue_is_not_found(app):
+    status, _, _ = request(AsyncApp(app), '/venues/999')
+    assert status == 404
+
+def test_other_routes_go_to_the_flask_app(app):
+    make_venue(name='Async Hall')
+    db.session.commit()
+    status, _, body = request(AsyncApp(app), '/api/v1/venues')
+    assert status == 200
+    assert b'Async Hall' in body
@@ -0,0 +1,49 @@
+import gzip
+import shutil
+import pytest
+import assets
+
+@pytest.fixture
+def built(app, tmp_path):
+    """The app serving a fresh build of a copy of static/."""
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, str(static), ignore=shutil.ignore_patterns(assets.DIST))
+    app.static_folder = str(static)
+    app.config['ASSETS_BUNDLED'] = True
+    app.extensions['assets'] = assets.build(app.static_folder, app.static_url_path)
+    return app.extensions['assets']
+
+def test_build_fingerprints_every_file_and_bundle(app, built):
+    assert set(assets.BUNDLES) <= set(built)
+    name = built['css/site.css']
+    assert name.startswith('dist/css/site.') and name.endswith('.css') and name != 'dist/css/site.css'
+    # the same input builds to the same names
+    assert assets.build(app.static_folder) == built
+
+def test_bundles_link_the_built_file(app, built):
+    with app.test_request_context():
+        assert assets.asset_urls('css/site.css') == ['/static/' + built['css/site.css']]
+        assert assets.asset_url('js/script.js') == '/static/' + built['js/script.js']
+
+def test_unbundled_links_the_sources(app):
+    app.config['ASSETS_BUNDLED'] = False
+    with app.test_request_context():
+        assert assets.asset_urls('js/footer.js') == ['/static/' + name for name in assets.BUNDLES['js/footer.js']]
+
+def test_built_files_are_immutable_and_precompressed(client, built):
+    url = '/static/' + built['css/site.css']
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert plain.headers['Cache-Control'] == assets.CACHE_CONTROL
+    assert 'immutable' in plain.headers['Cache-Control']
+    assert 'Content-Encoding' not in plain.headers
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Content-Type'].startswith('text/css')
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.data) == plain.data
+
+def test_unknown_built_file_is_not_found(client, built):
+    assert client.get('/static/dist/css/nope.css').status_code == 404
+    assert client.get('/static/dist/../../app.py').status_code == 404
@@ -0,0 +1,37 @@
+from conftest import make_venue, make_artist
+from autocomplete import PrefixIndex
+from models import db
+
+def names(response):
+    return [hit['name'] for hit in response.get_json()['data']]
+
+def test_names_starting_with_the_prefix_come_first():
+    index = PrefixIndex([(1, 'Petals Park'), (2, 'Guns N Petals'), (3, 'Peter Pan'), (4, 'Matt Quevedo')])
+    assert [name for _, name in index.complete('pet')] == ['Petals Park', 'Peter Pan', 'Guns N Petals']
+    assert index.complete('pet', limit=1) == [(1, 'Petals Park')]
+    assert index.complete('  ') == []
+
+def test_accents_and_case_are_ignored():
+    index = PrefixIndex([(1, 'Café Tacvba')])
+    assert index.complete('CAFE') == [(1, 'Café Tacvba')]
+
+def test_index_follows_commits(client):
+    venue = make_venue(name='The Dueling Pianos Bar')
+    db.session.commit()
+    assert names(client.get('/api/v1/autocomplete/venues?q=duel')) == ['The Dueling Pianos Bar']
+    assert names(client.get('/api/v1/autocomplete/venues?q=pianos')) == ['The Dueling Pianos Bar']
+
+    venue.name = 'Park Square Live Music'
+    db.session.commit()
+    assert names(client.get('/api/v1/autocomplete/venues?q=duel')) == []
+    assert names(client.get('/api/v1/autocomplete/venues?q=park')) == ['Park Square Live Music']
+
+    make_venue(name='Parkside')
+    db.session.rollback()
+    assert names(client.get('/api/v1/autocomplete/venues?q=park')) == ['Park Square Live Music']
+
+def test_artists_and_limit(client):
+    for name in ('Matt Quevedo', 'Matt Berry', 'Mattress Band'):
+        make_artist(name=name)
+    db.session.commit()
+    assert names(client.get('/api/v1/autocomplete/artists?q=matt&limit=2')) == ['Matt Berry', 'Matt Quevedo']
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import pytest
+from conftest import make_venue, make_artist, add_shows
+from cache import page_cache
+from models import db
+
+pytestmark = pytest.mark.app_config(CACHE_TYPE='simple')
+
+@pytest.fixture
+def booked(client):
+    """A venue and an artist with a show together, plus one of each without."""
+    venue, artist = make_venue(name='Booked Hall'), make_artist(name='Booked Band')
+    other_venue, other_artist = make_venue(name='Quiet Hall'), make_artist(name='Quiet Band')
+    add_shows(venue, artist, 2)
+    ids = dict(venue=venue.id, artist=artist.id, other_venue=other_venue.id, other_artist=other_artist.id)
+    for path in ('/venues', '/artists', '/shows',
+                 '/venues/{venue}', '/venues/{other_venue}', '/artists/{artist}', '/artists/{other_artist}'):
+        assert client.get(path.format(**ids)).status_code == 200
+    return ids
+
+def groups(ids):
+    return {
+        'venues': 'venues', 'artists': 'artists', 'shows': 'shows',
+        'venue': 'venue:{venue}'.format(**ids),
+        'other_venue': 'venue:{other_venue}'.format(**ids),
+        'artist': 'artist:{artist}'.format(**ids),
+        'other_artist': 'artist:{other_artist}'.format(**ids),
+    }
+
+def evicted_by(ids, write):
+    before = {name: page_cache.backend.generation(group) for name, group in groups(ids).items()}
+    write()
+    return {name for name, group in groups(ids).items()
+            if page_cache.backend.generation(group) != before[name]}
+
+def venue_form(**fields):
+    form = dict(name='Booked Hall', city='San Francisco', state='CA', address='1015 Folsom Street',
+                phone='123-123-1234', image_link='https://example.com/venue.jpg',
+                facebook_link='https://www.facebook.com/venue', genres='Jazz')
+    form.update(fields)
+    return form
+
+def artist_form(**fields):
+    form = dict(name='Booked Band', city='San Francisco', state='CA', phone='326-123-5000',
+                facebook_link='https://www.facebook.com/artist', genres='Jazz')
+    form.update(fields)
+    return form
+
+def test_venue_edit_evicts_only_pages_showing_the_venue(client, booked):
+    path = '/venues/{venue}/edit'.format(**booked)
+    evicted = evicted_by(booked, lambda: client.post(path, data=venue_form(name='Renamed Hall')))
+    assert evicted == {'venues', 'shows', 'venue', 'artist'}
+
+    assert b'Renamed Hall' in client.get('/venues/{venue}'.format(**booked)).data
+    assert b'Renamed Hall' in client.get('/artists/{artist}'.format(**booked)).data
+    assert b'Renamed Hall' in client.get('/venues').data
+
+def test_artist_edit_leaves_unrelated_venue_pages_cached(client, booked):
+    path = '/artists/{artist}/edit'.format(**booked)
+    evicted = evicted_by(booked, lambda: client.post(path, data=artist_form(name='Renamed Band')))
+    assert evicted == {'artists', 'shows', 'artist', 'venue'}
+    assert 'other_venue' not in evicted and 'venues' not in evicted
+
+    assert b'Renamed Band' in client.get('/artists/{artist}'.format(**booked)).data
+    assert b'Renamed Band' in client.get('/venues/{venue}'.format(**booked)).data
+
+def test_show_create_evicts_both_sides(client, booked):
+    start = (datetime.now() + timedelta(days=30)).replace(microsecond=0)
+    evicted = evicted_by(booked, lambda: client.post('/shows/create', data={
+        'venue_id': booked['other_venue'], 'artist_id': booked['other_artist'],
+        'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}))
+    assert evicted == {'venues', 'artists', 'shows', 'other_venue', 'other_artist'}
+
+    assert b'Quiet Band' in client.get('/venues/{other_venue}'.format(**booked)).data
+    assert b'Quiet Hall' in client.get('/artists/{other_artist}'.format(**booked)).data
@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from conftest import make_venue, make_artist, add_shows
+from models import db, Venue
+
+pytestmark = pytest.mark.app_config(CACHE_TYPE='simple')
+
+def test_unchanged_page_is_not_modified(client):
+    venue = make_venue()
+    db.session.commit()
+    first = client.get('/venues/{}'.format(venue.id))
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get('/venues/{}'.format(venue.id), headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+def test_new_etag_never_comes_with_a_cached_body(client):
+    venue = make_venue(name='Old Name')
+    db.session.commit()
+    first = client.get('/venues/{}'.format(venue.id))
+    assert b'Old Name' in first.data
+
+    # a write made by another worker: nothing invalidates this process's cache
+    db.session.execute(update(Venue).where(Venue.id == venue.id)
+                       .values(name='New Name', updated_at=datetime.utcnow() + timedelta(seconds=1)))
+    db.session.commit()
+
+    second = client.get('/venues/{}'.format(venue.id))
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert b'New Name' in second.data
+
+def test_show_moving_into_the_past_changes_the_page(client):
+    venue, artist = make_venue(), make_artist()
+    add_shows(venue, artist, 1, now=datetime.now() + timedelta(seconds=0.5))
+    first = client.get('/venues/{}'.format(venue.id))
+
+    # the show starts; nothing is written
+    time.sleep(0.6)
+    second = client.get('/venues/{}'.format(venue.id), headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert second.data != first.data
+
+def test_delete_is_seen_by_if_modified_since(client):
+    kept, deleted = make_venue(name='Kept Hall'), make_venue(name='Deleted Hall')
+    db.session.commit()
+    first = client.get('/venues')
+    assert b'Deleted Hall' in first.data
+    assert 'Last-Modified' not in first.headers
+
+    client.post('/venues/{}/delete'.format(deleted.id))
+    second = client.get('/venues', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert second.status_code == 200
+    assert b'Deleted Hall' not in second.data
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from conftest import make_venue, make_artist
+from models import db, Show
+
+@pytest.fixture
+def catalogue(client):
+    old = make_venue(name='Old Hall', genres=['Jazz', 'Blues'], updated_at=datetime(2019, 1, 1))
+    new = make_venue(name='New Hall', updated_at=datetime(2020, 1, 1))
+    artist = make_artist(name='Guns N Petals', updated_at=datetime(2019, 1, 1))
+    db.session.add(Show(venue_id=old.id, artist_id=artist.id, start_time=datetime(2019, 5, 21, 21, 30),
+                        updated_at=datetime(2019, 1, 1)))
+    db.session.add(Show(venue_id=new.id, artist_id=artist.id, start_time=datetime(2020, 5, 21, 21, 30),
+                        updated_at=datetime(2020, 1, 1)))
+    db.session.commit()
+    return client
+
+def test_venues_csv(catalogue):
+    response = catalogue.get('/export/venues.csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=venues.csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['name'] for row in rows] == ['Old Hall', 'New Hall']
+    assert rows[0]['genres'] == 'Jazz,Blues'
+    assert rows[0]['updated_at'] == '2019-01-01T00:00:00'
+
+def test_shows_jsonl(catalogue):
+    response = catalogue.get('/export/shows.jsonl')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=shows.jsonl'
+    shows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(s['venue_name'], s['artist_name'], s['start_time']) for s in shows] == [
+        ('Old Hall', 'Guns N Petals', '2019-05-21T21:30:00'),
+        ('New Hall', 'Guns N Petals', '2020-05-21T21:30:00'),
+    ]
+
+def test_columnar(catalogue):
+    response = catalogue.get('/export/artists.columnar')
+    assert response.headers['Content-Disposition'] == 'attachment; filename=artists.jsonl'
+    (chunk,) = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert chunk['count'] == 1
+    assert chunk['columns']['name'] == ['Guns N Petals']
+
+def test_since_keeps_rows_modified_at_or_after(catalogue):
+    body = catalogue.get('/export/shows.jsonl?since=2020-01-01T00:00:00').get_data(as_text=True)
+    assert [json.loads(line)['venue_name'] for line in body.splitlines()] == ['New Hall']
+    rows = list(csv.DictReader(io.StringIO(
+        catalogue.get('/export/venues.csv?since=2021-01-01').get_data(as_text=True))))
+    assert rows == []
+
+def test_bad_since_is_400(catalogue):
+    assert catalogue.get('/export/venues.csv?since=yesterday').status_code == 400
+
+def test_unknown_entity_or_format_is_404(catalogue):
+    assert catalogue.get('/export/users.csv').status_code == 404
+    assert catalogue.get('/export/venues.xml').status_code == 404
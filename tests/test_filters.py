@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from filters import format_datetime
+
+START = datetime(2035, 4, 1, 20, 30)
+
+def test_times_show_as_stored(app):
+    with app.test_request_context(headers={'Cookie': 'timezone=Asia/Tokyo'}):
+        assert format_datetime(START, 'full') == 'Sunday April, 1, 2035 at 8:30PM'
+
+def test_user_timezone_is_opt_in(app):
+    app.config['USER_TIMEZONES'] = True
+    with app.test_request_context(headers={'Cookie': 'timezone=Asia/Tokyo'}):
+        assert format_datetime(START, 'full') == 'Monday April, 2, 2035 at 5:30AM'
@@ -0,0 +1,59 @@
+import pytest
+from conftest import make_venue, make_artist
+from genres import GENRES, slugify, genre_for_slug
+from models import db
+
+@pytest.fixture
+def catalogue(client):
+    make_venue(name='Blue Note', state='NY', genres=['Jazz', 'Blues'], seeking_talent=True)
+    make_venue(name='Jazz Loft', state='CA', genres=['Jazz'], seeking_talent=False)
+    make_venue(name='Rock Barn', state='CA', genres=['Rock n Roll'], seeking_talent=True)
+    make_artist(name='Quiet Trio', state='NY', genres=['Jazz'], seeking_venue=True)
+    make_artist(name='Loud Quartet', state='CA', genres=['Rock n Roll', 'R&B'], seeking_venue=False)
+    db.session.commit()
+    return client
+
+def listed(response, names):
+    body = response.get_data(as_text=True)
+    return {name for name in names if name in body}
+
+VENUES = {'Blue Note', 'Jazz Loft', 'Rock Barn'}
+ARTISTS = {'Quiet Trio', 'Loud Quartet'}
+
+def test_slugs_round_trip():
+    for genre in GENRES:
+        assert genre_for_slug(slugify(genre)) == genre
+    assert slugify('Rock n Roll') == 'rock-n-roll'
+    assert slugify('R&B') == 'r-b'
+    assert genre_for_slug('polka') is None
+
+def test_genre_index_links_every_genre(client):
+    body = client.get('/genres').get_data(as_text=True)
+    for genre in GENRES:
+        assert '/venues/genres/{}"'.format(slugify(genre)) in body
+        assert '/artists/genres/{}"'.format(slugify(genre)) in body
+
+def test_venues_by_genre(catalogue):
+    response = catalogue.get('/venues/genres/jazz')
+    assert response.status_code == 200
+    assert listed(response, VENUES) == {'Blue Note', 'Jazz Loft'}
+    assert listed(catalogue.get('/venues/genres/rock-n-roll'), VENUES) == {'Rock Barn'}
+    assert listed(catalogue.get('/venues/genres/folk'), VENUES) == set()
+
+def test_venues_by_genre_narrowed_by_state_and_seeking(catalogue):
+    assert listed(catalogue.get('/venues/genres/jazz?state=CA'), VENUES) == {'Jazz Loft'}
+    assert listed(catalogue.get('/venues/genres/jazz?seeking=1'), VENUES) == {'Blue Note'}
+    assert listed(catalogue.get('/venues/genres/jazz?seeking=0'), VENUES) == {'Jazz Loft'}
+    # anything but 1 / 0 is no filter
+    assert listed(catalogue.get('/venues/genres/jazz?seeking=yes'), VENUES) == {'Blue Note', 'Jazz Loft'}
+
+def test_artists_by_genre(catalogue):
+    assert listed(catalogue.get('/artists/genres/jazz'), ARTISTS) == {'Quiet Trio'}
+    assert listed(catalogue.get('/artists/genres/r-b'), ARTISTS) == {'Loud Quartet'}
+    assert listed(catalogue.get('/artists/genres/jazz?state=CA'), ARTISTS) == set()
+    assert listed(catalogue.get('/artists/genres/rock-n-roll?seeking=0'), ARTISTS) == {'Loud Quartet'}
+    assert listed(catalogue.get('/artists/genres/rock-n-roll?seeking=1'), ARTISTS) == set()
+
+def test_unknown_genre_is_404(catalogue):
+    assert catalogue.get('/venues/genres/polka').status_code == 404
+    assert catalogue.get('/artists/genres/polka').status_code == 404
@@ -0,0 +1,25 @@
+import io
+import json
+from importer import import_rows, read_rows
+from models import Artist
+
+def artist_line(name):
+    return json.dumps({'name': name, 'city': 'San Francisco', 'state': 'CA',
+                       'phone': '326-123-5000', 'genres': 'Jazz',
+                       'facebook_link': 'https://www.facebook.com/artist',
+                       'image_link': 'https://example.com/artist.jpg'})
+
+def test_bad_json_lines_are_rejected_not_fatal(app):
+    source = io.StringIO('\n'.join([
+        artist_line('First'),
+        '{"name": "Truncated',
+        '[1, 2]',
+        artist_line('Last'),
+    ]))
+    report = import_rows('artists', read_rows(source, 'jsonl'), batch_size=10)
+
+    assert report.inserted == 2
+    assert report.rejected == 2
+    assert report.errors[0].startswith('record 2: ')
+    assert report.errors[1] == 'record 3: not an object'
+    assert sorted(artist.name for artist in Artist.query) == ['First', 'Last']
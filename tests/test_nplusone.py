@@ -0,0 +1,45 @@
+import pytest
+from conftest import make_venue, make_artist, add_shows
+from models import Venue
+import nplusone
+from nplusone import NPlusOneError, RepeatTracker, fingerprint
+
+@pytest.mark.parametrize('statement', [
+    'SELECT * FROM "Show" WHERE venue_id = 12 AND name = \'it\'\'s\'',
+    'SELECT  *\n  FROM "Show" WHERE venue_id = ? AND name = ?',
+    'SELECT * FROM "Show" WHERE venue_id = %(venue_id_1)s AND name = %(name_1)s',
+    'SELECT * FROM "Show" WHERE venue_id = $1 AND name = $2',
+])
+def test_fingerprint_collapses_literals_and_placeholders(statement):
+    assert fingerprint(statement) == 'SELECT * FROM "Show" WHERE venue_id = ? AND name = ?'
+
+def test_fingerprint_collapses_in_lists():
+    assert fingerprint('SELECT id FROM "Venue" WHERE id IN (1, 2, 3)') \
+        == fingerprint('SELECT id FROM "Venue" WHERE id IN (?)')
+
+def test_repeat_tracker_reports_past_the_threshold():
+    tracker = RepeatTracker(threshold=3)
+    for venue_id in range(3):
+        tracker.record('SELECT * FROM "Show" WHERE venue_id = {}'.format(venue_id))
+    tracker.record('SELECT 1')
+    assert tracker.offenders() == []
+
+    tracker.record('SELECT * FROM "Show" WHERE venue_id = 3')
+    tracker.record('SELECT * FROM "Show" WHERE venue_id = 4')
+    [(count, key, site)] = tracker.offenders()
+    assert count == 5
+    assert key == 'SELECT * FROM "Show" WHERE venue_id = ?'
+    assert site.startswith('tests/test_nplusone.py:')
+
+def test_lazy_loading_view_raises(app, client):
+    artist = make_artist()
+    for _ in range(app.config['NPLUSONE_THRESHOLD'] + 1):
+        add_shows(make_venue(), artist, 1)
+
+    def lazy_show_counts():
+        return {venue.id: len(venue.shows) for venue in Venue.query.all()}
+    app.add_url_rule('/lazy-show-counts', 'lazy_show_counts', lazy_show_counts)
+
+    assert nplusone.mode(app) == 'raise'
+    with pytest.raises(NPlusOneError, match='lazy_show_counts'):
+        client.get('/lazy-show-counts')
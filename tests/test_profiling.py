@@ -0,0 +1,38 @@
+import importlib
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from flask import g
+from models import db
+from profiling import RequestProfile
+import config
+
+def test_failed_statement_leaves_no_start_time_behind(app):
+    with app.test_request_context(), db.engine.connect() as connection:
+        g.profile = RequestProfile()
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+        assert not connection.info.get('profile_started')
+        connection.execute(text('SELECT 1'))
+        assert g.profile.sql_count == 1
+
+def test_metrics_are_off_by_default_outside_debug(monkeypatch):
+    monkeypatch.setenv('DEBUG', '0')
+    monkeypatch.delenv('METRICS_ENABLED', raising=False)
+    try:
+        assert importlib.reload(config).METRICS_ENABLED is False
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
+
+@pytest.mark.app_config(METRICS_ENABLED=False)
+def test_metrics_can_be_turned_off(client):
+    assert client.get('/metrics').status_code == 404
+
+@pytest.mark.app_config(METRICS_ENABLED=True, METRICS_TOKEN='s3cret')
+def test_metrics_require_the_token(client):
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert b'fyyur_requests_total' in response.data
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from conftest import make_venue, make_artist, add_shows
+
+class StatementCounter(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(Engine, 'after_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'after_cursor_execute', self)
+
+def statements_for(client, path):
+    with StatementCounter() as counter:
+        response = client.get(path)
+    assert response.status_code == 200
+    return counter.count
+
+@pytest.mark.parametrize('path', ['/venues/{venue_id}', '/artists/{artist_id}'])
+def test_page_query_count_is_constant(app, client, path):
+    venue, artist = make_venue(), make_artist()
+    path = path.format(venue_id=venue.id, artist_id=artist.id)
+
+    counts, added = [], 0
+    for total in (2, 20, 200):
+        add_shows(venue, artist, total - added)
+        added = total
+        counts.append(statements_for(client, path))
+    assert counts[0] == counts[1] == counts[2], counts
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from conftest import make_venue, make_artist, add_shows
+import scheduling
+from scheduling import Slot
+
+START = datetime(2035, 4, 1, 20, 0)
+
+def slot(venue_id, artist_id, hours, length=2):
+    start = START + timedelta(hours=hours)
+    return Slot(venue_id, artist_id, start, start + timedelta(hours=length))
+
+def test_overlapping_within_keeps_the_earlier_slot():
+    slots = [slot(1, 1, 1), slot(1, 2, 0), slot(2, 1, 3)]
+    assert scheduling.overlapping_within(slots) == {0}
+
+def test_rejected_slot_reserves_nothing():
+    # slot 1 clashes with slot 0 at venue 1, so artist 2 stays free for slot 2
+    slots = [slot(1, 1, 0), slot(1, 2, 1), slot(2, 2, 2)]
+    assert scheduling.overlapping_within(slots) == {1}
+    # with slot 0 rejected beforehand, slot 1 is kept and blocks slot 2
+    assert scheduling.overlapping_within(slots, {0}) == {2}
+
+def test_check_slots_spans_several_queries(app):
+    venue, artist = make_venue(), make_artist()
+    add_shows(venue, artist, 1, now=START)
+    slots = [slot(venue.id, 0, 24 * i + 3) for i in range(scheduling.MAX_SLOTS)]
+    slots[-1] = slot(venue.id, artist.id, 0)
+    results = scheduling.check_slots(slots)
+    assert len(results) == scheduling.MAX_SLOTS
+    assert results[-1]['conflicts'] and not results[-1]['errors']
+    assert all(result['errors'] == ['artist 0 does not exist'] for result in results[:-1])
+    assert not any(result['conflicts'] for result in results[:-1])
+
+def test_create_show_for_missing_venue_is_a_bad_request(client):
+    artist = make_artist()
+    response = client.post('/shows/create', data={
+        'venue_id': 999, 'artist_id': artist.id, 'start_time': '2035-04-01 20:00:00'})
+    assert response.status_code == 400
+
+def test_create_show_redirects_home(client):
+    venue, artist = make_venue(), make_artist()
+    response = client.post('/shows/create', data={
+        'venue_id': venue.id, 'artist_id': artist.id, 'start_time': '2035-04-01 20:00:00'})
+    assert response.status_code == 302
+    assert response.location.endswith('/')
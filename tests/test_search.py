@@ -0,0 +1,49 @@
+import search
+from conftest import make_venue, make_artist
+from models import db, Venue
+
+def names(result):
+    return [hit['name'] for hit in result['data']]
+
+def test_name_matches_rank_above_place_and_genre(app):
+    make_venue(name='Oakland Arena', city='San Jose', genres=['Rock n Roll'])
+    make_venue(name='Blue Room', city='Oakland', genres=['Jazz'])
+    make_venue(name='Red Room', city='Fresno', genres=['Jazz'])
+    db.session.commit()
+    result = search.search_venues('oakland')
+    assert result['count'] == 2
+    assert names(result) == ['Oakland Arena', 'Blue Room']
+
+def test_prefixes_and_typos_match(app):
+    make_artist(name='Guns N Petals')
+    make_artist(name='Matt Quevedo')
+    db.session.commit()
+    assert names(search.search_artists('pet')) == ['Guns N Petals']
+    assert names(search.search_artists('quevdo')) == ['Matt Quevedo']
+
+def test_genres_match(app):
+    make_artist(name='The Wild Sax Band', genres=['Jazz', 'Classical'])
+    make_artist(name='Guns N Petals', genres=['Rock n Roll'])
+    db.session.commit()
+    assert names(search.search_artists('classical')) == ['The Wild Sax Band']
+
+def test_every_word_must_match(app):
+    make_venue(name='Park Square Live Music & Coffee', city='San Francisco')
+    make_venue(name='Park Lane', city='New York', state='NY')
+    db.session.commit()
+    assert names(search.search_venues('park francisco')) == ['Park Square Live Music & Coffee']
+
+def test_index_is_dropped_on_commit_not_flush(app):
+    make_venue(name='Old Hall')
+    db.session.commit()
+    assert names(search.search_venues('hall')) == ['Old Hall']
+
+    make_venue(name='New Hall')
+    # a search between the flush and a rollback keeps the committed index
+    assert names(search.search_venues('hall')) == ['Old Hall']
+    db.session.rollback()
+    assert names(search.search_venues('hall')) == ['Old Hall']
+
+    make_venue(name='Next Hall')
+    db.session.commit()
+    assert names(search.search_venues('hall')) == ['Next Hall', 'Old Hall']
@@ -0,0 +1,49 @@
+import json
+import threading
+import time
+from conftest import make_venue, make_artist
+from models import db
+import search
+
+def test_results_are_merged_best_first(client):
+    make_venue(name='Blue Note', city='New York', state='NY')
+    make_venue(name='Red Room', city='Blue Springs', state='MO')
+    make_artist(name='Blue Oyster Cult')
+    make_artist(name='Green Day')
+    db.session.commit()
+
+    response = client.get('/search?search_term=blue&format=jsonl')
+    assert response.mimetype == 'application/x-ndjson'
+    hits = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [(hit['type'], hit['name']) for hit in hits] == [
+        ('venue', 'Blue Note'), ('artist', 'Blue Oyster Cult'), ('venue', 'Red Room')]
+    assert [hit['score'] for hit in hits] == sorted((hit['score'] for hit in hits), reverse=True)
+
+def test_html_page_lists_both_kinds(client):
+    make_venue(name='Blue Note')
+    make_artist(name='Blue Oyster Cult')
+    db.session.commit()
+    body = client.get('/search?search_term=blue').data
+    assert b'Blue Note' in body and b'Blue Oyster Cult' in body
+
+def test_closing_early_stops_the_workers(app):
+    for i in range(50):
+        make_venue(name='Hall {}'.format(i))
+        make_artist(name='Hall Band {}'.format(i))
+    db.session.commit()
+    running = threading.active_count()
+    hits = search.search_all('hall', batch_size=2)
+    assert len([next(hits) for _ in range(3)]) == 3
+    assert threading.active_count() == running + 2
+    hits.close()
+    deadline = time.monotonic() + 5
+    while threading.active_count() > running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == running
+
+def test_api_search_all(client):
+    make_venue(name='Blue Note')
+    make_artist(name='Blue Oyster Cult')
+    db.session.commit()
+    body = client.get('/api/v1/search?q=blue&type=all&limit=1').get_json()
+    assert len(body['data']) == 1
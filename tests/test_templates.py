@@ -0,0 +1,38 @@
+import os
+import pytest
+from conftest import create_app, make_venue
+from cache import page_cache
+from models import db
+
+@pytest.mark.app_config(CACHE_TYPE='simple')
+def test_cache_tag_reuses_a_block_until_its_key_changes(app):
+    template = app.jinja_env.from_string(
+        "{% cache 'tile', venue.id, venue.version %}{{ venue.name }}{% endcache %}")
+    assert template.render(venue={'id': 1, 'version': 1, 'name': 'Old'}) == 'Old'
+    # same key: the cached block is used, not the new data
+    assert template.render(venue={'id': 1, 'version': 1, 'name': 'New'}) == 'Old'
+    assert template.render(venue={'id': 1, 'version': 2, 'name': 'New'}) == 'New'
+    assert template.render(venue={'id': 2, 'version': 1, 'name': 'Other'}) == 'Other'
+
+def test_null_cache_type_renders_every_time(app):
+    template = app.jinja_env.from_string("{% cache 'tile', 1 %}{{ name }}{% endcache %}")
+    assert template.render(name='Old') == 'Old'
+    assert template.render(name='New') == 'New'
+
+@pytest.mark.app_config(CACHE_TYPE='simple')
+def test_listing_tiles_follow_edits(client):
+    venue = make_venue(name='Tile Hall')
+    db.session.commit()
+    assert b'Tile Hall' in client.get('/venues').data
+    venue.name = 'Renamed Tile Hall'
+    db.session.commit()
+    page_cache.invalidate('venues')
+    assert b'Renamed Tile Hall' in client.get('/venues').data
+
+def test_compiled_templates_are_cached_on_disk(tmp_path):
+    directory = tmp_path / 'bytecode'
+    directory.mkdir()
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                      'TEMPLATE_BYTECODE_CACHE': True, 'TEMPLATE_BYTECODE_CACHE_DIR': str(directory)})
+    app.jinja_env.get_template('pages/home.html')
+    assert os.listdir(str(directory))
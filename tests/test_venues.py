@@ -0,0 +1,20 @@
+from conftest import make_venue, make_artist, add_shows
+from counters import refresh_counters
+from models import db, Venue, Artist, Show
+
+def test_delete_venue_removes_its_shows_and_recounts_artists(client):
+    venue, other = make_venue(), make_venue()
+    artist = make_artist()
+    add_shows(venue, artist, 4)
+    add_shows(other, artist, 2)
+    refresh_counters([venue.id, other.id], [artist.id])
+    db.session.commit()
+    venue_id, artist_id = venue.id, artist.id
+
+    response = client.post('/venues/{}/delete'.format(venue_id))
+    assert response.status_code == 302
+
+    assert Venue.query.get(venue_id) is None
+    assert Show.query.filter_by(venue_id=venue_id).count() == 0
+    artist = Artist.query.get(artist_id)
+    assert artist.shows_count == 2
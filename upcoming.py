@@ -0,0 +1,119 @@
+import threading
+from datetime import datetime
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session, object_session
+from models import db, Venue, Artist, Show, UpcomingShow
+from cache import page_cache
+
+#----------------------------------------------------------------------------#
+# Upcoming shows relation.
+#
+# UpcomingShow holds every show that had not started at the last refresh,
+# joined to its venue and artist. On Postgres it is a materialized view,
+# refreshed CONCURRENTLY so readers are never blocked; elsewhere it is a
+# summary table rebuilt in one transaction. Readers still filter on
+# start_time >= now, since shows pass into the past between refreshes.
+#
+# Commits touching shows, venues or artists schedule a refresh
+# UPCOMING_REFRESH_DELAY seconds later (bursts of writes coalesce into one),
+# and `flask refresh-upcoming` is meant to run on a schedule (cron) to drop
+# shows that have started.
+#----------------------------------------------------------------------------#
+
+def _upcoming_select(now):
+    # SQLite's multi-argument max() is Postgres' greatest(); the Postgres
+    # view is defined in its migration.
+    return select(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.image_link,
+        Show.artist_id,
+        Artist.name,
+        Artist.image_link,
+        func.max(Show.updated_at, Venue.updated_at, Artist.updated_at),
+    ).join(Venue, Venue.id == Show.venue_id) \
+        .join(Artist, Artist.id == Show.artist_id) \
+        .where(Show.start_time >= now)
+
+def refresh_upcoming_shows(now=None):
+    """Rebuild UpcomingShow from Show, Venue and Artist."""
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level='AUTOCOMMIT').execute(
+                text('REFRESH MATERIALIZED VIEW CONCURRENTLY "UpcomingShow"'))
+    else:
+        table = UpcomingShow.__table__
+        with engine.begin() as connection:
+            connection.execute(table.delete())
+            connection.execute(table.insert().from_select(
+                [column.name for column in table.columns], _upcoming_select(now or datetime.now())))
+    page_cache.invalidate('shows')
+
+#----------------------------------------------------------------------------#
+# Refresh after writes.
+#----------------------------------------------------------------------------#
+
+_timer_lock = threading.Lock()
+_timer = None
+
+def _run_refresh(app):
+    global _timer
+    with _timer_lock:
+        _timer = None
+    with app.app_context():
+        try:
+            refresh_upcoming_shows()
+        except Exception:
+            app.logger.exception('refreshing UpcomingShow failed')
+
+def refresh_soon():
+    """Schedule a refresh, unless one is already pending in this process."""
+    global _timer
+    app = current_app._get_current_object()
+    delay = app.config.get('UPCOMING_REFRESH_DELAY', 2)
+    if delay <= 0:
+        return refresh_upcoming_shows()
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(delay, _run_refresh, args=(app,))
+        _timer.daemon = True
+        _timer.start()
+
+def _mark_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['upcoming_dirty'] = True
+
+def _mark_dirty_bulk(context):
+    if context.mapper.class_ in (Show, Venue, Artist):
+        context.session.info['upcoming_dirty'] = True
+
+def _after_commit(session):
+    if session.info.pop('upcoming_dirty', False) and has_app_context():
+        refresh_soon()
+
+def _after_rollback(session):
+    session.info.pop('upcoming_dirty', None)
+
+for _model in (Show, Venue, Artist):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _mark_dirty)
+event.listen(Session, 'after_bulk_update', _mark_dirty_bulk)
+event.listen(Session, 'after_bulk_delete', _mark_dirty_bulk)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
+
+@click.command('refresh-upcoming')
+@with_appcontext
+def refresh_command():
+    """Rebuild the upcoming shows relation."""
+    refresh_upcoming_shows()
@@ -0,0 +1,9 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:application"""
+import os
+
+# never run the production server with the debugger enabled
+os.environ.setdefault('DEBUG', '0')
+
+from app import create_app
+
+application = create_app()